@@ -0,0 +1,157 @@
+"""
+Local load test for the read API (wod_api.py).
+
+Starts the API under uvicorn (or targets a running one with --url) and drives it with
+keep-alive connections that request "today's WOD" and "next 7 days" for the given users,
+half of them revalidating with If-None-Match like a polling wall display. Reports
+throughput, latency percentiles and status codes.
+
+    python api_loadtest.py --user kirkdale --seconds 10 --connections 64
+    python api_loadtest.py --url http://127.0.0.1:8000 --server-workers 4
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import statistics
+import subprocess
+import sys
+import time
+import urllib.parse
+import urllib.request
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def start_server(port, workers):
+    process = subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "wod_api:app", "--port", str(port), "--workers", str(workers),
+         "--log-level", "warning", "--no-access-log"],
+        # The stores are relative to the working directory; the module sits next to this script
+        env={**os.environ, "PYTHONPATH": os.path.dirname(os.path.abspath(__file__))},
+    )
+    url = f"http://127.0.0.1:{port}"
+    for _ in range(100):
+        try:
+            urllib.request.urlopen(url + "/health", timeout=1).read()
+            return process, url
+        except OSError:
+            time.sleep(0.1)
+    process.terminate()
+    raise SystemExit("The API did not start")
+
+
+def paths_for(users):
+    paths = []
+    for user in users:
+        quoted = urllib.parse.quote(user)
+        paths += [f"/users/{quoted}/wod", f"/users/{quoted}/calendar?days=7"]
+    return paths
+
+
+async def connection(host, port, paths, deadline, latencies, statuses, revalidate, rng):
+    """One keep-alive client: sends a request, reads the full response, repeats until deadline."""
+    reader, writer = await asyncio.open_connection(host, port)
+    etags = {}
+    try:
+        while time.perf_counter() < deadline:
+            path = rng.choice(paths)
+            headers = f"GET {path} HTTP/1.1\r\nHost: {host}\r\n"
+            if revalidate and path in etags:
+                headers += f"If-None-Match: {etags[path]}\r\n"
+            started = time.perf_counter()
+            writer.write((headers + "\r\n").encode())
+            status_line = await reader.readline()
+            status = int(status_line.split()[1])
+            length = 0
+            while True:
+                line = await reader.readline()
+                if line in (b"\r\n", b""):
+                    break
+                name, _, value = line.decode().partition(":")
+                name = name.lower()
+                if name == "content-length":
+                    length = int(value)
+                elif name == "etag":
+                    etags[path] = value.strip()
+            if length:
+                await reader.readexactly(length)
+            latencies.append(time.perf_counter() - started)
+            statuses[status] = statuses.get(status, 0) + 1
+    finally:
+        writer.close()
+
+
+async def run_load(url, paths, connections, seconds, seed):
+    parsed = urllib.parse.urlparse(url)
+    rng = random.Random(seed)
+    latencies, statuses = [], {}
+    deadline = time.perf_counter() + seconds
+    started = time.perf_counter()
+    await asyncio.gather(*(
+        connection(parsed.hostname, parsed.port or 80, paths, deadline, latencies, statuses, i % 2 == 1,
+                   random.Random(rng.random()))
+        for i in range(connections)
+    ))
+    return latencies, statuses, time.perf_counter() - started
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--url", help="target a running API instead of starting one")
+    parser.add_argument("--port", type=int, default=8765, help="port for the API started by this script")
+    parser.add_argument("--server-workers", type=int, default=1, help="uvicorn worker processes for the started API")
+    parser.add_argument("--user", action="append", default=[], help="user to request (repeatable; default: up to 100 users)")
+    parser.add_argument("--connections", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--json", action="store_true", help="print the summary as JSON")
+    args = parser.parse_args(argv)
+
+    users = args.user
+    if not users:
+        import wod_engine
+        users = list(wod_engine.load_user_config().get("users", {}))[:100]
+    if not users:
+        raise SystemExit("No users to request")
+
+    process = None
+    url = args.url
+    if url is None:
+        process, url = start_server(args.port, args.server_workers)
+    try:
+        paths = paths_for(users)
+        log(f"Warming {len(paths)} paths on {url}")
+        for path in paths:
+            urllib.request.urlopen(url + path).read()
+        log(f"{args.connections} connections for {args.seconds}s")
+        latencies, statuses, elapsed = asyncio.run(run_load(url, paths, args.connections, args.seconds, args.seed))
+    finally:
+        if process is not None:
+            process.terminate()
+            process.wait()
+
+    latencies.sort()
+    quantile = lambda q: round(latencies[min(len(latencies) - 1, int(q * len(latencies)))] * 1000, 2)
+    summary = {
+        "requests": len(latencies),
+        "seconds": round(elapsed, 2),
+        "requests_per_second": round(len(latencies) / elapsed),
+        "latency_ms": {"mean": round(statistics.fmean(latencies) * 1000, 2), "p50": quantile(0.5),
+                       "p90": quantile(0.9), "p99": quantile(0.99)},
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+    }
+    if args.json:
+        print(json.dumps(summary))
+    else:
+        print(f"{summary['requests']} requests in {summary['seconds']}s: {summary['requests_per_second']} req/s")
+        print("latency ms: " + ", ".join(f"{name} {value}" for name, value in summary["latency_ms"].items()))
+        print("statuses: " + ", ".join(f"{status} x{count}" for status, count in summary["statuses"].items()))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
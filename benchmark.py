@@ -0,0 +1,354 @@
+"""
+Headless benchmark suite for the WOD app's hot paths.
+
+Generates a reproducible synthetic dataset (users, WOD catalog, workout results) at a chosen
+scale, times each hot path, writes the timings as JSON and compares them against a stored
+baseline. Only the Streamlit-free wod_engine module is imported, inside the data directory.
+
+    python benchmark.py --scale small
+    python benchmark.py --scale medium --save-baseline
+    python benchmark.py --scale large --data-dir /data/wody-bench   # 10k users, 1M WODs, 10M results
+"""
+import argparse
+import contextlib
+import datetime
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+# users, catalog entries, result rows
+SCALES = {
+    "tiny": (100, 5_000, 20_000),
+    "small": (1_000, 50_000, 200_000),
+    "medium": (5_000, 250_000, 2_000_000),
+    "large": (10_000, 1_000_000, 10_000_000),
+}
+SCALE_ORDER = list(SCALES)
+DEFAULT_BASELINE_FILE = "benchmark_baseline.json"
+RESULT_CHUNK_ROWS = 200_000
+SEED = 20240601
+# Cases that write results; they run against a snapshot that is put back afterwards
+RESULT_WRITE_CASES = {"save_workout_result", "update_workout_result"}
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def import_app(data_dir):
+    """
+    Imports wod_engine with data_dir as the working directory, since it uses relative file names.
+    Each further scale resets the engine's process-wide store flags and caches, which would
+    otherwise still point at the previous scale's (already migrated) stores.
+    """
+    sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+    os.chdir(data_dir)
+    import wod_engine
+    wod_engine.reset_stores()
+    return wod_engine
+
+
+# --------------------- SYNTHETIC DATA -----------------------
+
+def generate_users(app, count, rng):
+    """Replaces the user directory with count users in one transaction."""
+    users = {}
+    for i in range(count):
+        users[f"user{i:05d}"] = {
+            "email": f"user{i:05d}@example.com",
+            "password": app.hash_password(f"password{i}"),
+            "skill_level": rng.randint(1, 5),
+            "intensity": rng.randint(1, 5),
+            "variety": rng.randint(1, 5),
+            "preferred_movements": rng.sample(app.ALL_CROSSFIT_MOVEMENTS, rng.randint(6, 20))
+        }
+    app.save_user_config({"users": users})
+
+
+def generate_catalog(app, count):
+    """Generates about count catalog entries through the sharded database generator."""
+    themes = app.load_global_config().get("themes", ["Full Body"])
+    per_theme = max(1, count // len(themes))
+    if os.path.exists(app.WOD_DATABASE_FILE):
+        os.remove(app.WOD_DATABASE_FILE)
+    app.initialize_wod_database(per_theme=per_theme, seed=SEED, dedupe=False)
+
+
+def generate_results(app, count, users, rng):
+    """
+    Replaces the results with count rows spread over users and the last ten years, streamed
+    through import_workout_results(), which also rebuilds the analytics tables.
+    """
+    import numpy as np
+    np_rng = np.random.default_rng(SEED)
+    catalog = app.load_wod_database()
+    pool = [catalog[int(i)] for i in np_rng.integers(0, len(catalog), size=min(len(catalog), 5000))]
+    first_day = (datetime.date.today() - datetime.timedelta(days=3650)).toordinal()
+
+    def rows():
+        for start in range(0, count, RESULT_CHUNK_ROWS):
+            n = min(RESULT_CHUNK_ROWS, count - start)
+            user_idx = np_rng.integers(0, users, size=n)
+            days = np_rng.integers(0, 3651, size=n) + first_day
+            wods = np_rng.integers(0, len(pool), size=n)
+            minutes = np_rng.integers(5, 30, size=n)
+            seconds = np_rng.integers(0, 60, size=n)
+            calories = np_rng.integers(150, 900, size=n)
+            avg_hr = np_rng.integers(110, 170, size=n)
+            max_hr = avg_hr + np_rng.integers(10, 40, size=n)
+            for i in range(n):
+                wod = pool[wods[i]]
+                yield (
+                    f"user{user_idx[i]:05d}",
+                    datetime.date.fromordinal(int(days[i])).isoformat(),
+                    wod.get("Theme"), wod.get("Warm-Up"), wod.get("Strength"), wod.get("WOD"),
+                    f"{minutes[i]}:{seconds[i]:02d}",
+                    int(calories[i]), int(avg_hr[i]), int(max_hr[i])
+                )
+            log(f"  results: {start + n:,}/{count:,}")
+
+    app.import_workout_results(rows(), replace=True)
+
+
+def ensure_dataset(app, data_dir, scale):
+    """Generates the dataset for scale unless data_dir already holds it; returns generation timings."""
+    users, catalog, results = SCALES[scale]
+    marker = os.path.join(data_dir, "benchmark_dataset.json")
+    # "analytics": datasets from before the analytics tables were always rebuilt are regenerated
+    expected = {"scale": scale, "users": users, "catalog": catalog, "results": results, "seed": SEED, "analytics": True}
+    if os.path.exists(marker):
+        with open(marker) as f:
+            if json.load(f) == expected:
+                log(f"Reusing {scale} dataset in {data_dir}")
+                return {}
+    rng = random.Random(SEED)
+    timings = {}
+    log(f"Generating {scale} dataset in {data_dir}: {users:,} users, {catalog:,} WODs, {results:,} results")
+    for name, step in (
+        ("users", lambda: generate_users(app, users, rng)),
+        ("catalog", lambda: generate_catalog(app, catalog)),
+        ("results", lambda: generate_results(app, results, users, rng)),
+    ):
+        start = time.perf_counter()
+        step()
+        timings[f"generate_{name}"] = time.perf_counter() - start
+        log(f"  {name}: {timings[f'generate_{name}']:.1f}s")
+    with open(marker, "w") as f:
+        json.dump(expected, f)
+    return timings
+
+
+# --------------------- HOT PATHS -----------------------
+
+def benchmark_cases(app, scale):
+    """
+    Returns [(name, setup, run, ops)]: setup() runs untimed before each repeat and returns the
+    argument for run(arg); ops is the number of operations per run, for per-op timings.
+    """
+    rng = random.Random(SEED)
+    users, catalog_size, results = SCALES[scale]
+    catalog = app.load_wod_database()
+    wod_strings = [catalog[i]["WOD"] for i in rng.sample(range(len(catalog)), min(2000, len(catalog)))]
+    result_strings = [f"{rng.randint(3, 30)}:{rng.randint(0, 59):02d}" if rng.random() < 0.5 else f"{rng.randint(20, 300)} reps" for _ in range(10000)]
+    sample_user = "user00000"
+    record = app.load_user_record(sample_user)
+    themes = app.load_global_config().get("themes", ["Full Body"])
+    prefs = record["preferred_movements"]
+    day = str(datetime.date.today())
+
+    def clear_spec_cache():
+        with app._WOD_SPECS["lock"]:
+            app._WOD_SPECS["specs"].clear()
+
+    def cold_catalog():
+        app._wod_database_cache()["signature"] = None
+
+    def ensure_result_today():
+        if not app.load_user_results_range(sample_user, day, day):
+            app.save_workout_result(sample_user, day, catalog[0], "12:34", 400, 140, 170)
+
+    cases = [
+        ("generate_wod", None, lambda _: [app.generate_wod("AMRAP", prefs, 3, 3, rng) for _ in range(1000)], 1000),
+        ("suggest_ai_wod", None, lambda _: [app.suggest_ai_wod(sample_user, 3, 3, 3, catalog, prefs, rng, themes) for _ in range(1000)], 1000),
+        ("suggest_ai_wod_with_load", lambda: app.MovementLoad(), lambda load: [app.suggest_ai_wod(sample_user, 3, 3, 3, catalog, prefs, rng, themes, load, day) for _ in range(1000)], 1000),
+        ("extract_movements_from_wod_cold", clear_spec_cache, lambda _: [app.extract_movements_from_wod(w) for w in wod_strings], len(wod_strings)),
+        ("extract_movements_from_wod_warm", None, lambda _: [app.extract_movements_from_wod(w) for w in wod_strings], len(wod_strings)),
+        ("parse_result_str", None, lambda _: [app.parse_result_str(r) for r in result_strings], len(result_strings)),
+        ("generate_wod_calendar_batch_3650", None, lambda _: app.generate_wod_calendar_batch(datetime.date.today(), 3650, record, catalog, themes, seed=SEED), 1),
+        ("initialize_wod_calendar", None, lambda _: app.initialize_wod_calendar(sample_user, prefs, flush=True), 1),
+        ("initialize_wod_database_20k", None, lambda _: sum(1 for _ in app.generate_wod_database(themes, max(1, 20000 // len(themes)), seed=SEED, workers=1)), 1),
+        ("load_wod_database_cold", cold_catalog, lambda _: app.load_wod_database(), 1),
+        ("load_wod_database_warm", None, lambda _: app.load_wod_database(), 1),
+        ("find_wods_by_theme", None, lambda _: app.find_wods_by_theme(catalog, ["Cindy"]), 1),
+        ("movement_index_matching_ids", None, lambda _: app.load_movement_index().matching_ids(prefs), 1),
+        ("load_json_file_global_config", None, lambda _: app.load_json_file(app.GLOBAL_CONFIG_FILE, {}), 1),
+        ("save_json_file_global_config", lambda: app.load_json_file(app.GLOBAL_CONFIG_FILE, {}), lambda data: app.save_json_file(app.GLOBAL_CONFIG_FILE, data), 1),
+        ("load_user_record", None, lambda _: [app.load_user_record(f"user{i:05d}") for i in range(100)], 100),
+        ("load_workout_results_user", None, lambda _: app.load_workout_results(sample_user), 1),
+        ("load_user_results_range_30d", None, lambda _: app.load_user_results_range(sample_user, day, str(datetime.date.today() + datetime.timedelta(days=29))), 1),
+        ("save_workout_result", None, lambda _: [app.save_workout_result(sample_user, day, catalog[0], "12:34", 400, 140, 170) for _ in range(20)], 20),
+        ("update_workout_result", ensure_result_today, lambda _: app.update_workout_result(sample_user, day, result="11:11"), 1),
+        ("result_streaks", None, lambda _: app.result_streaks(sample_user), 1),
+        ("performance_chart_data", None, lambda _: app.performance_chart_data(sample_user, "Calories Burned"), 1),
+    ]
+    # Loading every user's rows into one DataFrame does not fit in memory at the largest scale
+    if results <= SCALES["medium"][2]:
+        cases.append(("load_workout_results_all", None, lambda _: app.load_workout_results(), 1))
+    return cases
+
+
+@contextlib.contextmanager
+def results_restored(app):
+    """Copies the results store and puts the copy back afterwards, so write cases leave the dataset unchanged."""
+    snapshot = app.WORKOUT_RESULTS_DB_FILE + ".snapshot"
+    with app.closing(app.connect_workout_results()) as conn, app.closing(sqlite3.connect(snapshot)) as copy:
+        conn.backup(copy)
+    try:
+        yield
+    finally:
+        with app.closing(sqlite3.connect(snapshot)) as copy, app.closing(app.connect_workout_results()) as conn:
+            copy.backup(conn)
+        for suffix in ("", "-wal", "-shm"):
+            if os.path.exists(snapshot + suffix):
+                os.remove(snapshot + suffix)
+        # Cached per-user results and analytics were built from the discarded writes
+        app.reset_stores()
+
+
+def run_benchmarks(app, scale, repeat, only=None):
+    """Times every case repeat times; returns {name: summary dict} in seconds."""
+    summaries = {}
+    for name, setup, run, ops in benchmark_cases(app, scale):
+        if only and not any(pattern in name for pattern in only):
+            continue
+        samples = []
+        with results_restored(app) if name in RESULT_WRITE_CASES else contextlib.nullcontext():
+            for _ in range(repeat):
+                arg = setup() if setup else None
+                start = time.perf_counter()
+                run(arg)
+                samples.append(time.perf_counter() - start)
+        samples.sort()
+        summaries[name] = {
+            "repeat": repeat,
+            "ops": ops,
+            "min": samples[0],
+            "median": statistics.median(samples),
+            "p95": samples[min(len(samples) - 1, int(round(0.95 * (len(samples) - 1))))],
+            "mean": statistics.fmean(samples),
+            "per_op_median": statistics.median(samples) / ops,
+        }
+        log(f"  {name:<36} median {summaries[name]['median'] * 1000:10.3f} ms  ({ops} ops)")
+    return summaries
+
+
+# --------------------- BASELINE -----------------------
+
+def git_commit():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+            cwd=os.path.dirname(os.path.abspath(__file__)), check=True
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def compare_to_baseline(report, baseline, tolerance):
+    """
+    Returns [(name, baseline median, current median, ratio)] for cases slower than the baseline
+    by more than tolerance (0.25 = 25%).
+    """
+    regressions = []
+    for name, current in report["results"].items():
+        previous = baseline.get("results", {}).get(name)
+        if previous is None or previous["median"] <= 0:
+            continue
+        ratio = current["median"] / previous["median"]
+        if ratio > 1 + tolerance:
+            regressions.append((name, previous["median"], current["median"], ratio))
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark the WOD app's hot paths without Streamlit.")
+    parser.add_argument("--scale", choices=SCALE_ORDER, action="append", help="dataset scale; repeat for several (default: tiny)")
+    parser.add_argument("--data-dir", help="directory for the synthetic dataset, reused across runs (default: a temporary directory)")
+    parser.add_argument("--repeat", type=int, default=5, help="timed repetitions per case")
+    parser.add_argument("--only", action="append", help="run only cases whose name contains this text")
+    parser.add_argument("--output", default="-", help="where to write the JSON report (default: stdout)")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE_FILE, help="baseline JSON to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store this run as the baseline instead of comparing")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="allowed slowdown before a case counts as a regression")
+    args = parser.parse_args(argv)
+
+    scales = args.scale or ["tiny"]
+    baseline_path = os.path.abspath(args.baseline)
+    output_path = None if args.output == "-" else os.path.abspath(args.output)
+    reports = {}
+    for scale in scales:
+        data_dir = os.path.abspath(os.path.join(args.data_dir, scale)) if args.data_dir else tempfile.mkdtemp(prefix=f"wody-bench-{scale}-")
+        os.makedirs(data_dir, exist_ok=True)
+        app = import_app(data_dir)
+        generation = ensure_dataset(app, data_dir, scale)
+        log(f"Running {scale} benchmarks")
+        reports[scale] = {
+            "scale": scale,
+            "dataset": dict(zip(("users", "catalog", "results"), SCALES[scale])),
+            "generation": generation,
+            "results": run_benchmarks(app, scale, args.repeat, args.only),
+        }
+
+    report = {
+        "created": datetime.datetime.now().isoformat(timespec="seconds"),
+        "commit": git_commit(),
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "cpus": os.cpu_count(),
+        "scales": reports,
+    }
+    text = json.dumps(report, indent=2)
+    if output_path:
+        with open(output_path, "w") as f:
+            f.write(text)
+    else:
+        print(text)
+
+    if args.save_baseline:
+        baseline = {}
+        if os.path.exists(baseline_path):
+            with open(baseline_path) as f:
+                baseline = json.load(f)
+        baseline.update({scale: {**scale_report, "commit": report["commit"]} for scale, scale_report in reports.items()})
+        with open(baseline_path, "w") as f:
+            json.dump(baseline, f, indent=2)
+        log(f"Saved baseline for {', '.join(reports)} to {baseline_path}")
+        return 0
+
+    if not os.path.exists(baseline_path):
+        log(f"No baseline at {baseline_path}; run with --save-baseline to create one")
+        return 0
+    with open(baseline_path) as f:
+        baseline = json.load(f)
+    failed = False
+    for scale, scale_report in reports.items():
+        if scale not in baseline:
+            log(f"No {scale} baseline stored")
+            continue
+        for name, before, after, ratio in compare_to_baseline(scale_report, baseline[scale], args.tolerance):
+            failed = True
+            log(f"REGRESSION {scale}/{name}: {before * 1000:.3f} ms -> {after * 1000:.3f} ms ({ratio:.2f}x)")
+    if not failed:
+        log("No regressions against the baseline")
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,95 @@
+"""
+Batch regeneration of stored WOD calendars.
+
+Reads the user directory once, regenerates each selected user's calendar from today with
+their current sliders and preferences on a pool of worker processes and reports per-user
+timing and throughput. Each calendar is written by a job on the wod_engine job queue, run
+by the worker itself after any job the app already queued for that user.
+
+    python regenerate_calendars.py                       # every user, one worker per core
+    python regenerate_calendars.py --user alice --user bob
+    python regenerate_calendars.py --match '^team_' --workers 4 --days 365 --json
+"""
+import argparse
+import json
+import os
+import re
+import sys
+import time
+
+import wod_engine
+
+
+def log(message):
+    print(message, file=sys.stderr, flush=True)
+
+
+def select_users(users, names, pattern):
+    """Returns {username: record} for the users named explicitly or matching pattern (all when neither is given)."""
+    if names:
+        unknown = [name for name in names if name not in users]
+        if unknown:
+            raise SystemExit(f"Unknown user(s): {', '.join(unknown)}")
+    matcher = re.compile(pattern) if pattern else None
+    return {
+        username: record for username, record in users.items()
+        if (not names or username in names) and (matcher is None or matcher.search(username))
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user", action="append", default=[], help="regenerate this user (repeatable)")
+    parser.add_argument("--match", help="regenerate users whose name matches this regular expression")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="worker processes (default: one per core)")
+    parser.add_argument("--days", type=int, default=3650, help="days to generate from today (default: 3650)")
+    parser.add_argument("--json", action="store_true", help="print one JSON object per user and a summary instead of a table")
+    args = parser.parse_args(argv)
+
+    if wod_engine.get_calendar_mode() != "stored":
+        log("Calendar mode is 'generated': WODs are derived on demand and there is nothing to regenerate.")
+        return 0
+    if not wod_engine.load_wod_database():
+        log("WOD Database is empty. Please regenerate the WOD Database first.")
+        return 1
+
+    users = select_users(wod_engine.load_user_config().get("users", {}), set(args.user), args.match)
+    if not users:
+        log("No users selected.")
+        return 1
+    log(f"Regenerating {len(users)} calendar(s), {args.days} days each, on {args.workers} worker(s)")
+
+    started = time.perf_counter()
+    total_days = failures = 0
+    results = wod_engine.regenerate_calendars(users, workers=args.workers, total_days=args.days)
+    for user, days, seconds, error in results:
+        total_days += days
+        failures += error is not None
+        if args.json:
+            print(json.dumps({"user": user, "days": days, "seconds": round(seconds, 4), "error": error}), flush=True)
+        elif error:
+            print(f"{user:<24} FAILED  {error}", flush=True)
+        else:
+            print(f"{user:<24} {days:>6} days  {seconds:8.3f}s  {days / seconds if seconds else 0:10.0f} days/s", flush=True)
+    elapsed = time.perf_counter() - started
+
+    summary = {
+        "users": len(users),
+        "failed": failures,
+        "days": total_days,
+        "seconds": round(elapsed, 3),
+        "users_per_second": round(len(users) / elapsed, 2) if elapsed else None,
+        "days_per_second": round(total_days / elapsed) if elapsed else None,
+    }
+    if args.json:
+        print(json.dumps({"summary": summary}))
+    else:
+        print(
+            f"{summary['users']} user(s), {failures} failed, {total_days} days in {elapsed:.2f}s "
+            f"({summary['users_per_second']} users/s, {summary['days_per_second']} days/s)"
+        )
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,32 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import wod_engine  # noqa: E402
+
+@pytest.fixture(autouse=True)
+def data_dir(tmp_path, monkeypatch):
+    """Runs every test against empty stores in its own working directory."""
+    monkeypatch.chdir(tmp_path)
+    wod_engine.reset_stores()
+    yield tmp_path
+    wod_engine.reset_stores()
+
+
+@pytest.fixture
+def athlete():
+    """A small WOD database and one registered user, "alice"; returns her record."""
+    wod_engine.initialize_wod_database(per_theme=20, seed=1, workers=1)
+    record = {
+        "email": "alice@example.com",
+        "password": "",
+        "preferred_movements": list(wod_engine.ALL_CROSSFIT_MOVEMENTS),
+        "skill_level": 3,
+        "intensity": 3,
+        "variety": 3,
+    }
+    wod_engine.save_user_record("alice", record)
+    return dict(record)
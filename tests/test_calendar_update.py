@@ -0,0 +1,118 @@
+import datetime
+import json
+import time
+
+import wod_engine
+
+BURPEES = [name for name in wod_engine.ALL_CROSSFIT_MOVEMENTS if "Burpee" in name]
+
+
+def _wod(wod_format, wod, strength="4 sets of 5 Front Squat with short rest periods."):
+    return {"Theme": "Full Body", "Warm-Up": "", "Strength": strength, "WOD": wod, "Format": wod_format}
+
+
+def _without_burpees(record):
+    return {**record, "preferred_movements": [name for name in record["preferred_movements"] if name not in BURPEES]}
+
+
+def _uses_burpees(wod):
+    return any(name in BURPEES for name in wod_engine.wod_spec(wod).movements())
+
+
+def _write_calendar(user, record, start, days):
+    calendar = wod_engine.generate_wod_calendar_batch(
+        start, days, record, wod_engine.load_wod_database(), ["Full Body"],
+        movement_load=wod_engine.load_movement_load(user).copy()
+    )
+    wod_engine._write_user_calendar_days(user, calendar)
+    return calendar
+
+
+def test_preference_changes():
+    record = {"preferred_movements": ["Air Squat", "Pull-Up"], "skill_level": 3, "intensity": 3, "variety": 3}
+    assert wod_engine.preference_changes(record, record) is None
+    # Added movements and variety only shape new days
+    assert wod_engine.preference_changes(record, {**record, "preferred_movements": ["Air Squat", "Pull-Up", "Row"]}) is None
+    assert wod_engine.preference_changes(record, {**record, "variety": 5}) is None
+    # A skill change within the same format bucket changes nothing
+    assert wod_engine.preference_changes(record, {**record, "skill_level": 2}) is None
+
+    changes = wod_engine.preference_changes(record, {**record, "preferred_movements": ["Air Squat"]})
+    assert changes == {"removed": {"Pull-Up"}, "format": None, "intensity": None, "movements": True}
+    assert wod_engine.preference_changes(record, {**record, "skill_level": 5})["format"] == "For Time"
+    assert wod_engine.preference_changes(record, {**record, "intensity": 1})["intensity"] == 1
+    # No preferences before: the "No WOD available" days can now be filled
+    changes = wod_engine.preference_changes({**record, "preferred_movements": []}, record)
+    assert changes == {"removed": set(), "format": None, "intensity": None, "movements": True}
+
+
+def test_calendar_day_needs_update():
+    day = _wod("Rounds For Time", "5 Rounds For Time of: 10 Standard Burpee, 10 Air Squat")
+    removed = {"removed": {"Standard Burpee"}, "format": None, "intensity": None, "movements": True}
+    assert wod_engine.calendar_day_needs_update(day, removed)
+    assert not wod_engine.calendar_day_needs_update(day, {**removed, "removed": {"Pull-Up"}})
+
+    assert wod_engine.calendar_day_needs_update(day, {**removed, "removed": set(), "format": "For Time"})
+    assert not wod_engine.calendar_day_needs_update(day, {**removed, "removed": set(), "format": "Rounds For Time"})
+
+    # Intensity 5 generates 5-7 strength sets and 6-8 rounds
+    intensity = {**removed, "removed": set(), "intensity": 5}
+    rounds = "6 Rounds For Time of: 10 Standard Burpee, 10 Air Squat"
+    assert not wod_engine.calendar_day_needs_update(_wod("Rounds For Time", rounds, "5 sets of 5 Deadlift"), intensity)
+    assert wod_engine.calendar_day_needs_update(_wod("Rounds For Time", rounds, "4 sets of 5 Deadlift"), intensity)
+    assert wod_engine.calendar_day_needs_update(_wod("Rounds For Time", day["WOD"], "5 sets of 5 Deadlift"), intensity)
+
+    # Standard WODs keep their own format and rounds; only movements and strength are checked
+    standard = _wod("Standard", "20 Minute AMRAP: 5 Pull-Ups, 10 Push-Ups, 15 Air Squats", "N/A")
+    assert not wod_engine.calendar_day_needs_update(standard, {**intensity, "format": "AMRAP"})
+    assert wod_engine.calendar_day_needs_update(standard, {**removed, "removed": {"Push-Ups"}})
+
+    empty = _wod("N/A", "No WOD available", "")
+    assert wod_engine.calendar_day_needs_update(empty, {**removed, "removed": set(), "intensity": 5})
+    assert not wod_engine.calendar_day_needs_update(empty, {**removed, "movements": False})
+
+
+def test_update_job_regenerates_only_affected_future_days(athlete):
+    today = datetime.date.today()
+    past = _write_calendar("alice", athlete, today - datetime.timedelta(days=60), 60)
+    future = _write_calendar("alice", athlete, today, 400)
+    assert any(_uses_burpees(wod) for wod in future.values())
+
+    new_record = _without_burpees(athlete)
+    job_id = wod_engine.submit_calendar_update("alice", athlete, new_record)
+    job = wod_engine.wait_for_job(job_id, timeout=30)
+    assert (job["status"], job["done"], job["total"]) == ("done", 400, 400)
+
+    calendar = wod_engine.load_wod_calendar("alice")
+    assert len(calendar) == 460
+    assert all(calendar[date_str] == wod for date_str, wod in past.items())
+    for date_str, wod in future.items():
+        if _uses_burpees(wod):
+            assert not _uses_burpees(calendar[date_str])
+        else:
+            assert calendar[date_str] == wod
+
+
+def test_update_covers_days_a_queued_calendar_job_still_has_to_write(athlete):
+    today = datetime.date.today()
+    _write_calendar("alice", athlete, today, wod_engine.CALENDAR_JOB_FIRST_DAYS)
+    # A calendar job with the old preferences, interrupted after its first month
+    params = {
+        "start": str(today),
+        **{name: athlete[name] for name in ("preferred_movements", "skill_level", "intensity", "variety")},
+    }
+    with wod_engine.closing(wod_engine.connect_jobs()) as conn, conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user, kind, params, status, done, total, created, updated) "
+            "VALUES ('earlier', 'alice', 'calendar', ?, 'queued', ?, 400, ?, ?)",
+            (json.dumps(params, sort_keys=True), wod_engine.CALENDAR_JOB_FIRST_DAYS, time.time(), time.time())
+        )
+
+    job_id = wod_engine.submit_calendar_update("alice", athlete, _without_burpees(athlete))
+    job = wod_engine.wait_for_job(job_id, timeout=60)
+    assert (job["status"], job["total"]) == ("done", 400)
+    assert wod_engine.load_job("earlier")["status"] == "done"
+
+    calendar = wod_engine.load_wod_calendar("alice")
+    assert len(calendar) == 400
+    assert not [date_str for date_str, wod in calendar.items() if _uses_burpees(wod)]
@@ -0,0 +1,30 @@
+import datetime
+
+import wod_engine
+
+
+def _config_reads():
+    return wod_engine._METRICS["counters"].get(("file_reads", (("file", wod_engine.GLOBAL_CONFIG_FILE),)), 0)
+
+
+def test_generated_window_reads_the_config_once(athlete):
+    config = wod_engine.load_global_config()
+    config["calendar_mode"] = "generated"
+    wod_engine.save_global_config(config)
+
+    reads = _config_reads()
+    window = wod_engine.get_calendar_window("alice", datetime.date.today(), 30, athlete, wod_engine.load_wod_database())
+    assert len(window) == 30 and all(wod is not None for _, wod in window)
+    assert _config_reads() - reads == 1
+
+
+def test_read_only_window_shows_what_the_app_stores(athlete):
+    database = wod_engine.load_wod_database()
+    start = datetime.date.today() + datetime.timedelta(days=5)
+    read = wod_engine.get_calendar_window("alice", start, 10, athlete, database, persist=False)
+    assert wod_engine.load_wod_calendar_range(str(start), str(start + datetime.timedelta(days=9)), "alice") == {}
+
+    shown = wod_engine.get_calendar_window("alice", start, 10, athlete, database)
+    assert shown == read
+    stored = wod_engine.load_wod_calendar_range(str(start), str(start + datetime.timedelta(days=9)), "alice")
+    assert stored == {str(date): wod for date, wod in read}
@@ -0,0 +1,103 @@
+import datetime
+import json
+import os
+import time
+
+import pytest
+
+import wod_engine
+
+
+def _insert_running_job(user, params, total, done, owner, owner_started):
+    """A job as a crashed process would leave it: running, with done days already written."""
+    start = datetime.date.fromisoformat(params["start"])
+    ready_until = str(start + datetime.timedelta(days=done - 1)) if done else None
+    with wod_engine.closing(wod_engine.connect_jobs()) as conn, conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user, kind, params, status, done, total, ready_until, owner, owner_started, created, updated) "
+            "VALUES ('crashed', ?, 'calendar', ?, 'running', ?, ?, ?, ?, ?, ?, ?)",
+            (user, json.dumps(params, sort_keys=True), done, total, ready_until, owner, owner_started, time.time(), time.time())
+        )
+
+
+def _calendar_params(record):
+    return {
+        "start": str(datetime.date.today()),
+        **{name: record[name] for name in ("preferred_movements", "skill_level", "intensity", "variety")},
+    }
+
+
+def _dead_pid():
+    pid = 999_999
+    while wod_engine._pid_alive(pid):
+        pid -= 1
+    return pid
+
+
+def test_identical_in_flight_jobs_are_deduplicated(athlete):
+    first = wod_engine.submit_calendar_job("alice", athlete["preferred_movements"], total_days=400)
+    assert wod_engine.submit_calendar_job("alice", athlete["preferred_movements"], total_days=400) == first
+    job = wod_engine.wait_for_job(first)
+    assert (job["status"], job["done"], job["total"]) == ("done", 400, 400)
+    assert len(wod_engine.load_wod_calendar("alice")) == 400
+    # Once finished, the same request queues a new job
+    assert wod_engine.submit_calendar_job("alice", athlete["preferred_movements"], total_days=400) != first
+    assert wod_engine.submit_calendar_job("alice", athlete["preferred_movements"][:-1], total_days=400) != first
+
+
+@pytest.mark.parametrize("owner", ["dead_pid", "reused_pid", "pid_reused_elsewhere"])
+def test_job_left_running_resumes_from_done(athlete, owner):
+    params = _calendar_params(athlete)
+    start = datetime.date.fromisoformat(params["start"])
+    written = {str(start + datetime.timedelta(days=i)): {"Theme": "Written before the crash", "WOD": ""} for i in range(31)}
+    wod_engine._write_user_calendar_days("alice", written)
+    if owner == "dead_pid":
+        _insert_running_job("alice", params, 400, 31, _dead_pid(), "old-boot")
+    elif owner == "reused_pid":
+        # Same PID as this process, but from an earlier incarnation of it
+        _insert_running_job("alice", params, 400, 31, os.getpid(), "old-boot")
+    else:
+        # The PID now belongs to an unrelated live process
+        _insert_running_job("alice", params, 400, 31, os.getppid(), "old-boot")
+
+    # A fresh process only reads the job; that alone must get it running again
+    job = wod_engine.latest_job("alice")
+    assert job["id"] == "crashed"
+    job = wod_engine.wait_for_job("crashed", timeout=30)
+    assert (job["status"], job["done"]) == ("done", 400)
+    assert job["ready_until"] == str(start + datetime.timedelta(days=399))
+
+    calendar = wod_engine.load_wod_calendar("alice")
+    assert len(calendar) == 400
+    assert all(calendar[date_str] == wod for date_str, wod in written.items())
+    assert all(wod["Theme"] != "Written before the crash" for date_str, wod in calendar.items() if date_str not in written)
+
+
+def test_job_of_live_process_is_left_alone(athlete):
+    _insert_running_job("alice", _calendar_params(athlete), 400, 31, os.getppid(), wod_engine._process_start(os.getppid()))
+    wod_engine.latest_job("alice")
+    time.sleep(0.3)
+    job = wod_engine.load_job("crashed")
+    assert (job["status"], job["done"], job["owner"]) == ("running", 31, os.getppid())
+
+
+@pytest.mark.parametrize("workers", [1, 2])
+def test_batch_regeneration_runs_after_the_users_queued_job(athlete, workers):
+    # Queued by the app, with the old preferences, and not picked up by any runner yet
+    old = dict(athlete, preferred_movements=athlete["preferred_movements"][:20])
+    new = dict(athlete, preferred_movements=athlete["preferred_movements"][20:])
+    with wod_engine.closing(wod_engine.connect_jobs()) as conn, conn:
+        conn.execute(
+            "INSERT INTO jobs (id, user, kind, params, status, total, created, updated) "
+            "VALUES ('queued', 'alice', 'calendar', ?, 'queued', 400, ?, ?)",
+            (json.dumps(_calendar_params(old), sort_keys=True), time.time(), time.time())
+        )
+
+    results = list(wod_engine.regenerate_calendars({"alice": new}, workers=workers, total_days=60))
+    assert [(user, days, error) for user, days, _, error in results] == [("alice", 60, None)]
+    assert wod_engine.load_job("queued")["status"] == "done"
+    # The batch job ran last: its 60 days, none of the old movements, nothing after them
+    calendar = wod_engine.load_wod_calendar("alice")
+    assert len(calendar) == 60
+    assert all(set(wod_engine.wod_spec(wod).movements()) <= set(new["preferred_movements"])
+               for wod in calendar.values() if wod["Theme"] != "Cindy")
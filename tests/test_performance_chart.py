@@ -0,0 +1,50 @@
+import datetime
+
+import numpy as np
+import pytest
+
+import wod_engine
+
+
+@pytest.mark.parametrize("n, threshold", [(10, 3), (1000, 100), (1001, 400), (5000, 7)])
+def test_lttb_keeps_the_endpoints_within_the_budget(n, threshold):
+    rng = np.random.default_rng(n)
+    x = np.cumsum(rng.uniform(0.5, 2.0, n))
+    y = rng.normal(size=n)
+    spike = n // 3
+    y[spike] = 100.0
+
+    kept = wod_engine.lttb(x, y, threshold)
+    assert len(kept) == threshold
+    assert kept[0] == 0 and kept[-1] == n - 1
+    assert np.all(np.diff(kept) > 0)
+    # The outlier forms the largest triangle in its bucket
+    assert spike in kept
+
+
+@pytest.mark.parametrize("threshold", [0, 2, 50, 51])
+def test_lttb_returns_small_series_whole(threshold):
+    x = np.arange(50, dtype=np.float64)
+    assert wod_engine.lttb(x, np.sin(x), threshold).tolist() == list(range(50))
+
+
+def test_performance_chart_data_downsamples_to_max_points():
+    start = datetime.date(2020, 1, 1)
+    rows = [
+        ("alice", str(start + datetime.timedelta(days=day)), "Full Body", "", "N/A", "12 Minute AMRAP of: 10 Air Squat",
+         str(100 + day % 37), None if day % 10 == 0 else 300 + day % 53, None, None)
+        for day in range(1500)
+    ]
+    rows.append(("bob", str(start), "Full Body", "", "N/A", "12 Minute AMRAP of: 10 Air Squat", "80", 999, None, None))
+    wod_engine.import_workout_results(reversed(rows))
+
+    data, total = wod_engine.performance_chart_data("alice", "Calories Burned", max_points=120)
+    assert total == 1350
+    assert len(data) == 120
+    assert data["Date"].is_monotonic_increasing
+    assert str(data["Date"].iloc[0].date()) == "2020-01-02"
+    assert str(data["Date"].iloc[-1].date()) == str(start + datetime.timedelta(days=1499))
+
+    data, total = wod_engine.performance_chart_data("alice", "Result", max_points=2000)
+    assert total == len(data) == 1500
+    assert data["Result"].tolist() == [float(100 + day % 37) for day in range(1500)]
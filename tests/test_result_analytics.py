@@ -0,0 +1,80 @@
+import datetime
+import random
+
+import wod_engine
+
+AMRAP = {"Theme": "Full Body", "Warm-Up": "", "Strength": "N/A", "WOD": "12 Minute AMRAP of: 10 Air Squat, 5 Pull-Up", "Format": "AMRAP"}
+FOR_TIME = {"Theme": "Full Body", "Warm-Up": "", "Strength": "N/A", "WOD": "5 Rounds For Time of: 10 Air Squat, 5 Pull-Up", "Format": "Rounds For Time"}
+ANALYTICS_TABLES = ("result_days", "result_periods", "result_bests", "result_streaks")
+
+
+def _result(wod, rng):
+    if wod is FOR_TIME:
+        return f"{rng.randint(8, 20)}:{rng.randint(0, 59):02d}"
+    return str(rng.randint(50, 200))
+
+
+def _metric(rng):
+    return None if rng.random() < 0.2 else rng.randint(80, 190)
+
+
+def _analytics(conn):
+    tables = {}
+    for table in ANALYTICS_TABLES:
+        rows = conn.execute(f"SELECT * FROM {table}").fetchall()
+        tables[table] = sorted(tuple(round(v, 6) if isinstance(v, float) else v for v in row) for row in rows)
+    return tables
+
+
+def _assert_matches_rebuild():
+    with wod_engine.closing(wod_engine.connect_workout_results()) as conn:
+        incremental = _analytics(conn)
+        wod_engine._rebuild_result_analytics(conn, batch_rows=7)
+        assert _analytics(conn) == incremental
+        conn.rollback()
+
+
+def test_incremental_analytics_match_a_full_rebuild():
+    rng = random.Random(3)
+    start = datetime.date(2026, 1, 1)
+    days = [str(start + datetime.timedelta(days=offset)) for offset in range(60) if rng.random() < 0.7]
+    seeded = [
+        (user, day, "Full Body", "", "N/A", wod["WOD"], _result(wod, rng), _metric(rng), _metric(rng), _metric(rng))
+        for user in ("alice", "bob") for day in days[:30] for wod in [rng.choice((AMRAP, FOR_TIME))]
+    ]
+    wod_engine.import_workout_results(seeded, replace=True)
+    _assert_matches_rebuild()
+
+    for user in ("alice", "bob"):
+        for day in days[30:]:
+            wod = rng.choice((AMRAP, FOR_TIME))
+            wod_engine.save_workout_result(user, day, wod, _result(wod, rng), _metric(rng), _metric(rng), _metric(rng))
+    # A second result on a day already logged
+    wod_engine.save_workout_result("alice", days[0], AMRAP, "75", 300, None, 170)
+    _assert_matches_rebuild()
+
+    updates = []
+    for day in rng.sample(days, 15):
+        fields = {"calories": _metric(rng), "avg_hr": _metric(rng)}
+        if rng.random() < 0.5:
+            fields.update(wod=FOR_TIME["WOD"], result=_result(FOR_TIME, rng))
+        updates.append((rng.choice(("alice", "bob")), day, fields))
+    assert wod_engine.update_workout_results(updates) >= 15
+    _assert_matches_rebuild()
+
+
+def test_personal_best_is_recomputed_after_an_edit():
+    wod_engine.save_workout_result("alice", "2026-03-01", FOR_TIME, "12:30", None, None, None)
+    wod_engine.save_workout_result("alice", "2026-03-05", FOR_TIME, "10:00", None, None, None)
+    wod_engine.save_workout_result("alice", "2026-03-09", FOR_TIME, "11:15", None, None, None)
+    assert wod_engine.personal_record("alice", FOR_TIME) == {"best": 600.0, "date": "2026-03-05", "lower_is_better": True, "attempts": 3}
+
+    # Editing the best row away falls back to the next best
+    assert wod_engine.update_workout_result("alice", "2026-03-05", result="13:00") == 1
+    assert wod_engine.personal_record("alice", FOR_TIME) == {"best": 675.0, "date": "2026-03-09", "lower_is_better": True, "attempts": 3}
+
+    # Moving a row to another WOD removes it from this one's attempts
+    assert wod_engine.update_workout_result("alice", "2026-03-09", wod=AMRAP["WOD"], result="120") == 1
+    assert wod_engine.personal_record("alice", FOR_TIME) == {"best": 750.0, "date": "2026-03-01", "lower_is_better": True, "attempts": 2}
+    assert wod_engine.personal_record("alice", AMRAP) == {"best": 120.0, "date": "2026-03-09", "lower_is_better": False, "attempts": 1}
+    assert wod_engine.result_streaks("alice", today=datetime.date(2026, 3, 10)) == (1, 1)
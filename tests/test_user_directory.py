@@ -0,0 +1,86 @@
+import sqlite3
+import threading
+
+import pytest
+
+import wod_engine
+
+
+def _record(email):
+    return {"email": email, "password": "", "preferred_movements": ["Air Squat"], "skill_level": 3, "intensity": 3, "variety": 3}
+
+
+class _GatedWriter(wod_engine.UserRecordWriter):
+    """Holds the first commit open until released, so later writes queue behind it."""
+
+    def __init__(self, fail_after_first=None):
+        super().__init__()
+        self.batches = []
+        self.first_started = threading.Event()
+        self.release = threading.Event()
+        self.fail_after_first = fail_after_first
+
+    def _commit(self, pending, errors):
+        self.batches.append(sorted(pending))
+        if len(self.batches) == 1:
+            self.first_started.set()
+            self.release.wait(5)
+        elif self.fail_after_first is not None:
+            raise self.fail_after_first
+        super()._commit(pending, errors)
+
+
+def _write_concurrently(writer, names):
+    """Writes names[0], then the rest while the first commit is in flight; returns {name: error or None}."""
+    outcomes = {}
+
+    def write(name):
+        try:
+            writer.write(name, _record(f"{name}@example.com"))
+            outcomes[name] = None
+        except BaseException as e:
+            outcomes[name] = e
+
+    threads = [threading.Thread(target=write, args=(names[0],))]
+    threads[0].start()
+    assert writer.first_started.wait(5)
+    for name in names[1:]:
+        threads.append(threading.Thread(target=write, args=(name,)))
+        threads[-1].start()
+    while len(writer._pending) < len(names) - 1:
+        threading.Event().wait(0.01)
+    writer.release.set()
+    for thread in threads:
+        thread.join(5)
+    return outcomes
+
+
+def test_writes_queued_behind_a_commit_share_one_batch():
+    writer = _GatedWriter()
+    outcomes = _write_concurrently(writer, ["ann", "bob", "cy", "dee"])
+    assert outcomes == {"ann": None, "bob": None, "cy": None, "dee": None}
+    assert writer.batches == [["ann"], ["bob", "cy", "dee"]]
+    assert all(wod_engine.load_user_record(name) is not None for name in outcomes)
+
+
+def test_integrity_error_only_fails_its_own_write():
+    wod_engine.save_user_record("ann", _record("taken@example.com"))
+    wod_engine.save_user_record("bob", _record("bob@example.com"))
+    with pytest.raises(sqlite3.IntegrityError):
+        wod_engine.save_user_record("cy", _record("taken@example.com"))
+    with pytest.raises(sqlite3.IntegrityError):
+        wod_engine.save_user_record("bob", _record("bob2@example.com"), create=True)
+    assert wod_engine.load_user_record("cy") is None
+    assert wod_engine.load_user_record("bob")["email"] == "bob@example.com"
+
+
+def test_failed_batch_commit_is_reported_to_every_waiter():
+    writer = _GatedWriter(fail_after_first=RuntimeError("disk gone"))
+    outcomes = _write_concurrently(writer, ["ann", "bob", "cy"])
+    assert outcomes["ann"] is None
+    assert isinstance(outcomes["bob"], RuntimeError) and outcomes["cy"] is outcomes["bob"]
+    assert wod_engine.load_user_record("bob") is None and wod_engine.load_user_record("cy") is None
+    # The writer is usable again afterwards
+    writer.fail_after_first = None
+    writer.write("bob", _record("bob@example.com"))
+    assert wod_engine.load_user_record("bob") is not None
@@ -0,0 +1,81 @@
+import asyncio
+import datetime
+import json
+import warnings
+
+import pytest
+
+with warnings.catch_warnings():
+    warnings.simplefilter("ignore")
+    from fastapi.testclient import TestClient
+
+import wod_api
+import wod_engine
+
+
+@pytest.fixture
+def client(athlete):
+    wod_api.cache.clear()
+    wod_api.versions.expire()
+    wod_api.versions.ttl = 0
+    return TestClient(wod_api.app)
+
+
+def test_calendar_reads_do_not_write(client):
+    version = wod_engine.wod_calendar_version()
+    response = client.get("/users/alice/calendar", params={"start": "2060-01-01", "days": 5})
+    assert response.status_code == 200
+    assert all(day["wod"] is not None for day in response.json()["days"])
+    assert wod_engine.load_wod_calendar_range("2060-01-01", "2060-01-05", "alice") == {}
+    assert wod_engine.wod_calendar_version() == version
+    # Unstored days come from a stable seed, so repeated reads agree
+    wod_api.cache.clear()
+    assert client.get("/users/alice/calendar", params={"start": "2060-01-01", "days": 5}).json() == response.json()
+
+
+def test_etag_and_invalidation_on_write(client):
+    day = str(datetime.date.today() + datetime.timedelta(days=3))
+    first = client.get("/users/alice/wod", params={"date": day})
+    assert first.status_code == 200
+    etag = first.headers["etag"]
+    assert client.get("/users/alice/wod", params={"date": day}, headers={"If-None-Match": etag}).status_code == 304
+    wod_engine.save_wod_calendar_day(day, {"Theme": "Pinned", "WOD": "x"}, "alice")
+    second = client.get("/users/alice/wod", params={"date": day}, headers={"If-None-Match": etag})
+    assert second.status_code == 200
+    assert second.json()["wod"]["Theme"] == "Pinned"
+
+
+def test_config_change_invalidates(client):
+    day = str(datetime.date.today())
+    client.get("/users/alice/wod", params={"date": day})
+    before = wod_api.versions.current()
+    config = wod_engine.load_global_config()
+    config["themes"] = ["Leg Day"]
+    with open(wod_engine.GLOBAL_CONFIG_FILE, "w") as f:
+        json.dump(config, f, indent=4)
+    assert wod_api.versions.current() != before
+
+
+def test_unknown_user_and_bad_range(client):
+    assert client.get("/users/nobody/wod").status_code == 404
+    assert client.get("/users/alice/calendar", params={"start": "2030-01-02", "end": "2030-01-01"}).status_code == 422
+
+
+def _on_event_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_versions_are_refreshed_off_the_event_loop(client, monkeypatch):
+    wod_api.versions.ttl = 60
+    wod_api.versions.expire()
+    reads = []
+    version = wod_engine.wod_calendar_version
+    monkeypatch.setattr(wod_engine, "wod_calendar_version", lambda: reads.append(_on_event_loop()) or version())
+    client.get("/users/alice/wod")
+    client.get("/users/alice/wod")
+    # Read once for both requests, and in the worker thread pool
+    assert reads == [False]
@@ -0,0 +1,37 @@
+import json
+
+import wod_engine
+
+
+def _records():
+    records = list(wod_engine.generate_wod_database(["Full Body", "Cindy"], 50, seed=7, workers=1))
+    # Records the binary layout cannot encode are kept verbatim
+    records.append({"Theme": "Cindy", "Warm-Up": "", "Strength": "N/A", "WOD": "20 Minute AMRAP: 5 Pull-Ups", "Format": "Standard", "Notes": 1})
+    records.append({"Theme": "Full Body", "Warm-Up": "", "Strength": "N/A", "WOD": "Run a mile, then rest", "Format": "Standard"})
+    return records
+
+
+def test_export_round_trips_the_json_database():
+    records = _records()
+    wod_engine.write_json_array(records, "source.json")
+    assert wod_engine.convert_json_to_catalog("source.json", "source.wodcat") == len(records)
+    wod_engine.export_wod_catalog("source.wodcat", "exported.json")
+    with open("source.json") as source, open("exported.json") as exported:
+        assert exported.read() == source.read()
+    with open("exported.json") as exported:
+        assert json.load(exported) == records
+
+
+def test_with_theme_matches_the_list_lookup():
+    records = _records()
+    wod_engine.write_wod_catalog(records, "source.wodcat")
+    catalog = wod_engine.WodCatalog("source.wodcat")
+    expected = wod_engine.find_wods_by_theme(records, ["Cindy"])
+
+    selection = wod_engine.find_wods_by_theme(catalog, ["Cindy"])
+    assert len(selection) == len(expected) == 51
+    assert sorted(map(json.dumps, selection)) == sorted(map(json.dumps, expected))
+    assert selection[-1] == records[-2]
+    # The themed positions are found once per catalog
+    assert wod_engine.find_wods_by_theme(catalog, ("Cindy",)).indices is selection.indices
+    assert len(wod_engine.find_wods_by_theme(catalog, ["Unknown"])) == 0
@@ -0,0 +1,41 @@
+import os
+
+import pytest
+
+import wod_engine
+
+THEMES = ["Full Body", "Upper Body", "Cindy"]
+
+
+@pytest.fixture
+def small_shards(monkeypatch):
+    """Splits each theme into several shards without generating thousands of WODs."""
+    monkeypatch.setattr(wod_engine, "WOD_SHARD_SIZE", 7)
+
+
+def test_same_seed_gives_the_same_entries_for_any_worker_count(small_shards):
+    progress = []
+    expected = list(wod_engine.generate_wod_database(THEMES, 30, seed=11, workers=1))
+    assert len(expected) == 90
+    assert [record["Theme"] for record in expected] == [theme for theme in THEMES for _ in range(30)]
+    for workers in (2, 3, 8):
+        records = wod_engine.generate_wod_database(THEMES, 30, seed=11, workers=workers, progress=lambda *args: progress.append(args))
+        assert list(records) == expected
+        assert progress[-1] == (90, 90)
+        del progress[:]
+    assert list(wod_engine.generate_wod_database(THEMES, 30, seed=12, workers=2)) != expected
+
+
+def test_same_seed_gives_the_same_database_files(small_shards, data_dir):
+    contents = []
+    for workers in (1, 3):
+        os.mkdir(f"workers-{workers}")
+        os.chdir(f"workers-{workers}")
+        wod_engine.reset_stores()
+        wod_engine.initialize_wod_database(per_theme=30, seed=5, workers=workers)
+        catalog = wod_engine.WodCatalog(wod_engine.WOD_CATALOG_FILE)
+        with open(wod_engine.WOD_DATABASE_FILE) as json_file:
+            # The catalog footer also records the JSON file's mtime, so compare its contents
+            contents.append((json_file.read(), catalog.records.tobytes(), catalog.movements, catalog.sentences, catalog.texts))
+        os.chdir(data_dir)
+    assert contents[0] == contents[1]
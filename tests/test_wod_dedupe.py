@@ -0,0 +1,52 @@
+import random
+
+import pytest
+
+import wod_engine
+
+AMRAP = "AMRAP 15 minutes: 9 Yoke Carry, 15 Kettlebell Clean, 15 Push Jerk, 15 Box Step-Ups"
+CHIPPER = ("Chipper: 16 Clean, 19 Back Squat, 13 Overhead Squat, 21 Sit-Ups, 16 Single Unders, "
+           "20 Front Squat, 20 Dumbbell Clean and Jerk, 21 Burpees with Pull-Up")
+
+
+def _record(wod, wod_format="AMRAP", theme="Full Body"):
+    return {"Theme": theme, "Warm-Up": "", "Strength": "N/A", "WOD": wod, "Format": wod_format}
+
+
+CASES = [
+    # (record, kept, reason)
+    (_record(AMRAP), True, "first"),
+    (_record(AMRAP, theme="Upper Body"), False, "exact: only the theme differs"),
+    (_record("AMRAP 15 minutes: 15 Box Step-Ups, 9 Yoke Carry, 15 Push Jerk, 15 Kettlebell Clean"), False, "exact: reordered"),
+    (_record("AMRAP 15 minutes: 10 Yoke Carry, 15 Kettlebell Clean, 15 Push Jerk, 15 Box Step-Ups"), False, "near: reps in the same bucket"),
+    (_record("AMRAP 15 minutes: 9 Yoke Carry, 25 Kettlebell Clean, 15 Push Jerk, 15 Box Step-Ups"), True, "reps in another bucket"),
+    (_record("AMRAP 15 minutes: 9 Yoke Carry, 15 Kettlebell Clean, 15 Thruster, 15 Box Step-Ups"), True, "another movement"),
+    (_record("5 Rounds For Time of: 9 Yoke Carry, 15 Kettlebell Clean, 15 Push Jerk, 15 Box Step-Ups", "Rounds For Time"), True, "another format"),
+    (_record(CHIPPER, "Chipper"), True, "first"),
+    (_record(CHIPPER.replace("21 Sit-Ups", "30 Sit-Ups"), "Chipper"), False, "near: one of eight parts differs"),
+    (_record("Run a mile, then rest", "Standard"), True, "unparsed"),
+    (_record("Run a mile, then rest", "Standard", theme="Cindy"), False, "exact: same unparsed text"),
+    (_record("Run two miles, then rest", "Standard"), True, "different unparsed text"),
+]
+
+
+@pytest.mark.parametrize("chunk_size", [1, 5, 4096])
+def test_dedupe_keep_and_drop_decisions(chunk_size):
+    deduplicator = wod_engine.WodDeduplicator()
+    kept = list(wod_engine.dedupe_wod_records((record for record, _, _ in CASES), deduplicator, chunk_size=chunk_size))
+    assert kept == [record for record, keep, _ in CASES if keep]
+    reasons = [reason.split(":")[0] for _, _, reason in CASES]
+    assert deduplicator.stats == {"seen": len(CASES), "exact_duplicates": reasons.count("exact"), "near_duplicates": reasons.count("near")}
+
+
+def test_catalog_and_list_deduplicate_alike():
+    rng = random.Random(2)
+    records = list(wod_engine.generate_wod_database(["Full Body", "Cindy"], 200, seed=3, workers=1))
+    records += [dict(rng.choice(records)) for _ in range(50)] + [record for record, _, _ in CASES]
+    wod_engine.write_wod_catalog(records, "source.wodcat")
+    catalog = wod_engine.WodCatalog("source.wodcat")
+
+    kept = wod_engine.find_unique_wods(records, chunk_size=64)
+    assert wod_engine.find_unique_wods(catalog, chunk_size=64).tolist() == kept.tolist()
+    assert [records[i] for i in kept] == list(wod_engine.dedupe_wod_records(records))
+    assert len(kept) <= len(records) - 50
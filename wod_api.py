@@ -0,0 +1,247 @@
+"""
+Read-only HTTP API for wall displays and mobile clients.
+
+Serves a user's WOD for a date, calendar ranges and workout results straight from the stores
+the Streamlit app writes, through wod_engine, without ever writing to them: calendar days not
+stored yet are rendered from their stable per-date seed. Rendered responses are kept in an
+in-memory LRU cache keyed by request, by the write counters of the calendar, results and user
+stores and by the signatures of the global config and WOD database files, so any write from
+any process invalidates them. Every response carries a strong ETag and
+If-None-Match is answered with 304 Not Modified.
+
+    uvicorn wod_api:app --workers 4
+    python wod_api.py --port 8000
+"""
+import argparse
+import collections
+import datetime
+import hashlib
+import json
+import os
+import threading
+import time
+
+from fastapi import FastAPI, HTTPException, Query, Request, Response
+from fastapi.concurrency import run_in_threadpool
+
+import wod_engine
+from wod_engine import count_metric, span
+
+API_CACHE_SIZE = int(os.environ.get("WODY_API_CACHE_SIZE", 4096))
+# Writes by other processes are noticed within this many seconds
+API_VERSION_TTL = float(os.environ.get("WODY_API_VERSION_TTL", 0.5))
+MAX_RANGE_DAYS = 366
+
+
+class StoreVersions:
+    """
+    The (calendar, results, users) write counters and the global config and WOD database file
+    signatures, re-read at most every ttl seconds so a cache hit never touches the disk.
+    current() may block on the stores; async code calls fresh() and, when that gives None,
+    runs current() in the worker thread pool.
+    """
+
+    def __init__(self, ttl=API_VERSION_TTL):
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._value = None
+        self._expires = 0.0
+
+    def fresh(self):
+        """The versions if read within the last ttl seconds, else None; never blocks."""
+        return self._value if time.monotonic() < self._expires else None
+
+    def current(self):
+        now = time.monotonic()
+        if now >= self._expires:
+            with self._lock:
+                if now >= self._expires:
+                    self._value = (
+                        wod_engine.wod_calendar_version(),
+                        wod_engine.workout_results_version(),
+                        wod_engine.user_directory_version(),
+                        wod_engine.file_signature(wod_engine.GLOBAL_CONFIG_FILE),
+                        wod_engine.file_signature(wod_engine.WOD_DATABASE_FILE),
+                    )
+                    self._expires = time.monotonic() + self.ttl
+        return self._value
+
+    def expire(self):
+        self._expires = 0.0
+
+
+class ResponseCache:
+    """LRU of {key: (versions, body, etag)}; an entry built under older versions is a miss."""
+
+    def __init__(self, maxsize=API_CACHE_SIZE):
+        self.maxsize = maxsize
+        self._lock = threading.Lock()
+        self._entries = collections.OrderedDict()
+
+    def get(self, key, versions):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] != versions:
+                return None
+            self._entries.move_to_end(key)
+            return entry[1], entry[2]
+
+    def put(self, key, versions, body, etag):
+        with self._lock:
+            self._entries[key] = (versions, body, etag)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.maxsize:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+versions = StoreVersions()
+cache = ResponseCache()
+app = FastAPI(title="Wody WOD API")
+
+
+def _etag(body):
+    return '"' + hashlib.blake2b(body, digest_size=12).hexdigest() + '"'
+
+
+def _not_modified(request, etag):
+    header = request.headers.get("if-none-match")
+    return header is not None and (header.strip() == "*" or etag in (tag.strip() for tag in header.split(",")))
+
+
+async def _cached(request, key, build):
+    """
+    Serves the cached body for key, or renders build() in the worker thread pool and caches it.
+    build returns a JSON-serialisable object; the body is encoded once and reused by every hit.
+    """
+    current = versions.fresh()
+    if current is None:
+        current = await run_in_threadpool(versions.current)
+    cached = cache.get(key, current)
+    if cached is None:
+        count_metric("cache_misses", cache="api")
+        body = json.dumps(await run_in_threadpool(build), separators=(",", ":")).encode()
+        etag = _etag(body)
+        # Cache under the versions read before building, so a write racing the build leaves it stale
+        cache.put(key, current, body, etag)
+    else:
+        count_metric("cache_hits", cache="api")
+        body, etag = cached
+    headers = {"ETag": etag, "Cache-Control": "no-cache"}
+    if _not_modified(request, etag):
+        return Response(status_code=304, headers=headers)
+    return Response(body, media_type="application/json", headers=headers)
+
+
+def _user_record(user):
+    user_record = wod_engine.load_user_record(user)
+    if user_record is None:
+        raise HTTPException(status_code=404, detail=f"Unknown user {user}")
+    return user_record
+
+
+def _calendar_days(user, start_date, days):
+    with span("api_calendar", days=str(days)):
+        user_record = _user_record(user)
+        window = wod_engine.get_calendar_window(
+            user, start_date, days, user_record, wod_engine.load_wod_database(), persist=False
+        )
+    return [{"date": str(date), "wod": wod} for date, wod in window]
+
+
+def _range_days(start, end, days):
+    start = start or datetime.date.today()
+    if end is not None:
+        days = (end - start).days + 1
+    if not 1 <= days <= MAX_RANGE_DAYS:
+        raise HTTPException(status_code=422, detail=f"A range must cover 1 to {MAX_RANGE_DAYS} days")
+    return start, days
+
+
+@app.get("/health")
+def health():
+    return {"status": "ok", "calendar_mode": wod_engine.get_calendar_mode()}
+
+
+@app.get("/metrics")
+def metrics():
+    return Response(wod_engine.metrics_prometheus(), media_type="text/plain; version=0.0.4")
+
+
+@app.get("/users/{user}/wod")
+async def user_wod(request: Request, user: str, date: datetime.date | None = None):
+    """The user's WOD for date (default: today)."""
+    date = date or datetime.date.today()
+
+    def build():
+        day = _calendar_days(user, date, 1)[0]
+        if day["wod"] is None:
+            raise HTTPException(status_code=404, detail=f"No WOD for {date}")
+        return {"user": user, **day}
+
+    return await _cached(request, ("wod", user, str(date)), build)
+
+
+@app.get("/users/{user}/calendar")
+async def user_calendar(
+    request: Request,
+    user: str,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    days: int = Query(7, ge=1, le=MAX_RANGE_DAYS),
+):
+    """The user's calendar from start (default: today) to end, or for days days."""
+    start, days = _range_days(start, end, days)
+    return await _cached(
+        request, ("calendar", user, str(start), days),
+        lambda: {"user": user, "days": _calendar_days(user, start, days)}
+    )
+
+
+@app.get("/users/{user}/results")
+async def user_results(
+    request: Request,
+    user: str,
+    start: datetime.date | None = None,
+    end: datetime.date | None = None,
+    days: int = Query(30, ge=1, le=MAX_RANGE_DAYS),
+):
+    """The user's recorded results (first per date) from start to end; start defaults to days ago."""
+    end = end or datetime.date.today()
+    start = start or end - datetime.timedelta(days=days - 1)
+    start, days = _range_days(start, end, days)
+
+    def build():
+        _user_record(user)
+        with span("api_results"):
+            results = wod_engine.load_user_results_range(user, str(start), str(end))
+        return {"user": user, "results": [results[date_str] for date_str in sorted(results)]}
+
+    return await _cached(request, ("results", user, str(start), str(end)), build)
+
+
+@app.get("/users/{user}/results/{date}")
+async def user_result(request: Request, user: str, date: datetime.date):
+    """The user's result for one date."""
+    def build():
+        _user_record(user)
+        result = wod_engine.load_user_results_range(user, str(date), str(date)).get(str(date))
+        if result is None:
+            raise HTTPException(status_code=404, detail=f"No result for {date}")
+        return result
+
+    return await _cached(request, ("result", user, str(date)), build)
+
+
+if __name__ == "__main__":
+    import uvicorn
+
+    parser = argparse.ArgumentParser(description="Run the read API with uvicorn.")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    parser.add_argument("--workers", type=int, default=1)
+    args = parser.parse_args()
+    uvicorn.run("wod_api:app", host=args.host, port=args.port, workers=args.workers, access_log=False)
@@ -0,0 +1,3388 @@
+"""
+Streamlit-free engine for the CrossFit WOD app: WOD generation and parsing, the WOD catalog,
+and the user, calendar and results stores. app33.py is the Streamlit front end; scripts and
+services can import this module directly without starting Streamlit.
+
+User-facing messages go through `reporter` (the "wod_engine" logger by default); the app
+routes them to Streamlit with set_reporter(st). pandas is imported only by the functions that
+return or accept DataFrames.
+"""
+import json
+import os
+import datetime
+import numpy as np
+import random
+import math
+import itertools
+import re
+import time
+import hashlib
+import logging
+import threading
+import collections
+import functools
+import sqlite3
+import tempfile
+import multiprocessing
+import uuid
+from contextlib import closing, contextmanager
+
+try:
+    import fcntl
+except ImportError:  # Windows: fall back to the atomic replace alone
+    fcntl = None
+
+logger = logging.getLogger("wod_engine")
+
+class _LogReporter:
+    """Default reporter for headless use: messages go to the "wod_engine" logger."""
+
+    def info(self, message):
+        logger.info(message)
+
+    def success(self, message):
+        logger.info(message)
+
+    def warning(self, message):
+        logger.warning(message)
+
+    def error(self, message):
+        logger.error(message)
+
+    def progress(self, value):
+        """Mirrors st.progress(): returns an object whose progress(value) updates the bar."""
+        return self
+
+reporter = _LogReporter()
+
+def set_reporter(new_reporter):
+    """
+    Routes user-facing messages to new_reporter, any object with info, success, warning,
+    error and progress like the streamlit module; None restores logging.
+    """
+    global reporter
+    reporter = new_reporter or _LogReporter()
+
+# --------------------- CONFIGURATION AND HELPER FUNCTIONS -----------------------
+
+# Filenames
+# One-off migration source: imported once into USER_DIRECTORY_DB_FILE, then never read or written
+USER_CONFIG_FILE = "user_config_new.json"
+USER_DIRECTORY_DB_FILE = "user_directory.db"  # Source of truth for users
+WORKOUT_RESULTS_FILE = "workout_results_new.csv"  # Legacy format, migrated into WORKOUT_RESULTS_DB_FILE
+WORKOUT_RESULTS_DB_FILE = "workout_results_new.db"
+WOD_CALENDAR_FILE = "wod_calendar_new.json"  # Legacy format, migrated into WOD_CALENDAR_DB_FILE
+WOD_CALENDAR_DB_FILE = "wod_calendar_new.db"
+JOBS_DB_FILE = "wod_jobs.db"  # Background job queue and progress
+GLOBAL_CONFIG_FILE = "config_new.json"
+WOD_DATABASE_FILE = "wod_database_new.json"
+WOD_CATALOG_FILE = "wod_database_new.wodcat"  # Memory-mapped binary form of WOD_DATABASE_FILE
+WOD_INDEX_FILE = "wod_database_new.index.npz"  # Movement bitmasks derived from WOD_DATABASE_FILE
+
+# Define all 80+ CrossFit Movements (including runs with distances and standard WODs)
+ALL_CROSSFIT_MOVEMENTS = [
+    # Foundational
+    "Air Squat", "Front Squat", "Overhead Squat", "Back Squat", "Deadlift",
+    "Sumo Deadlift High Pull", "Strict Press", "Push Press", "Push Jerk", "Thruster",
+    "Bench Press",
+    # Gymnastics
+    "Strict Pull-Up", "Kipping Pull-Up", "Butterfly Pull-Up", "Chest-to-Bar Pull-Up",
+    "Ring Muscle-Up", "Bar Muscle-Up", "Handstand Push-Up", "Deficit Handstand Push-Up",
+    "Wall Walk", "Ring Dips", "Bar Dips", "Hanging Leg Raises", "Knees-to-Elbow",
+    "GHD Sit-Ups", "V-Ups", "Hollow Rocks", "Superman Rocks", "Pistol Squat",
+    "Standard Rope Climb", "Legless Rope Climb", "Box Jumps", "Box Step-Ups",
+    "Burpee Box Jumps", "Standard Burpee", "Bar-Facing Burpee", "Lateral Burpee",
+    # Olympic Lifting
+    "Snatch", "Power Snatch", "Hang Snatch", "Clean", "Power Clean",
+    "Hang Clean", "Split Jerk", "Push Jerk", "Snatch Balance",
+    # Dumbbell/Kettlebell
+    "Dumbbell Snatch", "Dumbbell Thruster", "Dumbbell Clean and Jerk",
+    "Kettlebell Swing (Russian)", "Kettlebell Swing (American)", "Kettlebell Clean and Press",
+    "Turkish Get-Up", "Farmer’s Carry",
+    # Accessory
+    "Bent-Over Rows", "Barbell Rows", "Lateral Raises", "Shrugs",
+    "Banded Pull-Aparts", "Reverse Hypers", "Hip Extensions",
+    # Cardio (with distances)
+    "Run 400m", "Run 1km", "Run 5km",
+    "Rowing", "Assault Bike", "Echo Bike", "SkiErg", "Swimming",
+    "Single Unders", "Double Unders", "Triple Unders",
+    # Strongman
+    "Yoke Carry", "Sandbag Clean", "Sandbag Carry", "Sled Push",
+    "Sled Pull", "Atlas Stone Lifts", "Tire Flips",
+    # Additional Movements (to reach 80+)
+    "Burpee", "Mountain Climbers", "Plank", "Russian Twists", "Sit-Ups",
+    "Push-Up to T", "Lunges", "Step-Ups", "Burpees with Pull-Up",
+    "Plyometric Push-Up", "Broad Jumps", "Jumping Lunges", "Tuck Jumps",
+    "Medicine Ball Slams", "Battle Ropes", "Sled Drag", "Farmer's Walk",
+    "Thrusters with Dumbbells", "Kettlebell Clean", "Kettlebell Press",
+    # Standard CrossFit Workouts
+    "Cindy",
+    # ... add more as needed
+]
+
+# Define body parts targeted by movements (simplified for demonstration)
+MOVEMENT_BODY_PART = {
+    # Example mapping (to be filled as needed)
+    # "Air Squat": "Legs",
+    # ...
+}
+
+def hash_password(password):
+    return hashlib.sha256(password.encode()).hexdigest()
+
+def verify_password(stored_password, provided_password):
+    return stored_password == hash_password(provided_password)
+
+@contextmanager
+def file_lock(filename):
+    """Holds an exclusive cross-process lock on filename + ".lock" (no-op where fcntl is unavailable)."""
+    if fcntl is None:
+        yield
+        return
+    with open(f"{filename}.lock", "a") as lock_file:
+        fcntl.flock(lock_file, fcntl.LOCK_EX)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+# --- Instrumentation ---
+# Spans (durations) and counters are aggregated per process and shown in the debug sidebar
+# panel. Set WODY_METRICS_FILE to keep a Prometheus textfile up to date, and WODY_METRICS_LOG to
+# append one JSON line per page rerun.
+METRICS_SAMPLE_SIZE = 1024  # Most recent durations kept per span for percentiles
+METRICS_FILE = os.environ.get("WODY_METRICS_FILE")
+METRICS_LOG_FILE = os.environ.get("WODY_METRICS_LOG")
+METRICS_EXPORT_INTERVAL = 10.0  # Seconds between METRICS_FILE rewrites
+
+@functools.lru_cache(maxsize=None)
+def _metrics_registry():
+    """Process-wide {(name, labels): span stats} and {(name, labels): counter}, shared by every session."""
+    return {"lock": threading.Lock(), "spans": {}, "counters": {}, "exported": 0.0, "started": time.time()}
+
+_METRICS = _metrics_registry()
+
+def record_span(name, seconds, **labels):
+    key = (name, tuple(sorted(labels.items())))
+    with _METRICS["lock"]:
+        entry = _METRICS["spans"].get(key)
+        if entry is None:
+            entry = _METRICS["spans"][key] = {"count": 0, "sum": 0.0, "samples": collections.deque(maxlen=METRICS_SAMPLE_SIZE)}
+        entry["count"] += 1
+        entry["sum"] += seconds
+        entry["samples"].append(seconds)
+
+@contextmanager
+def span(name, **labels):
+    """Times the enclosed block as one sample of the (name, labels) span."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        record_span(name, time.perf_counter() - start, **labels)
+
+def timed(name):
+    """Decorator recording every call of the function as a sample of span name."""
+    def decorator(function):
+        @functools.wraps(function)
+        def wrapper(*args, **kwargs):
+            with span(name):
+                return function(*args, **kwargs)
+        return wrapper
+    return decorator
+
+def count_metric(name, value=1, **labels):
+    """Adds value to the (name, labels) counter, e.g. file_reads or cache_hits."""
+    key = (name, tuple(sorted(labels.items())))
+    with _METRICS["lock"]:
+        _METRICS["counters"][key] = _METRICS["counters"].get(key, 0) + value
+
+def metrics_snapshot():
+    """Returns {"spans": [...], "counters": [...]} with p50/p90/p99 over each span's recent samples."""
+    with _METRICS["lock"]:
+        spans = [(key, entry["count"], entry["sum"], list(entry["samples"])) for key, entry in _METRICS["spans"].items()]
+        counters = list(_METRICS["counters"].items())
+    snapshot = {"uptime": time.time() - _METRICS["started"], "spans": [], "counters": []}
+    for (name, labels), count, total, samples in sorted(spans):
+        p50, p90, p99 = np.quantile(samples, [0.5, 0.9, 0.99]).tolist()
+        snapshot["spans"].append({"name": name, "labels": dict(labels), "count": count, "sum": total, "p50": p50, "p90": p90, "p99": p99})
+    for (name, labels), value in sorted(counters):
+        snapshot["counters"].append({"name": name, "labels": dict(labels), "value": value})
+    return snapshot
+
+def _prometheus_labels(labels):
+    return ",".join(f'{key}="{str(value).replace(chr(92), chr(92) * 2).replace(chr(34), chr(92) + chr(34))}"' for key, value in labels.items())
+
+def metrics_prometheus():
+    """Renders every span as a summary and every counter in the Prometheus text exposition format."""
+    snapshot = metrics_snapshot()
+    lines = ["# HELP wody_span_seconds Duration of instrumented app spans.", "# TYPE wody_span_seconds summary"]
+    for entry in snapshot["spans"]:
+        labels = _prometheus_labels({"span": entry["name"], **entry["labels"]})
+        for quantile in ("0.5", "0.9", "0.99"):
+            lines.append(f'wody_span_seconds{{{labels},quantile="{quantile}"}} {entry["p" + quantile[2:].ljust(2, "0")]}')
+        lines.append(f"wody_span_seconds_sum{{{labels}}} {entry['sum']}")
+        lines.append(f"wody_span_seconds_count{{{labels}}} {entry['count']}")
+    declared = set()
+    for entry in snapshot["counters"]:
+        metric = f"wody_{entry['name']}_total"
+        if metric not in declared:
+            declared.add(metric)
+            lines.append(f"# TYPE {metric} counter")
+        labels = _prometheus_labels(entry["labels"])
+        lines.append(f"{metric}{{{labels}}} {entry['value']}" if labels else f"{metric} {entry['value']}")
+    return "\n".join(lines) + "\n"
+
+def export_metrics(page, seconds):
+    """Appends the rerun to METRICS_LOG_FILE and refreshes METRICS_FILE at most every METRICS_EXPORT_INTERVAL."""
+    if METRICS_LOG_FILE:
+        line = json.dumps({"ts": datetime.datetime.now().isoformat(timespec="milliseconds"), "event": "page", "page": page, "seconds": seconds})
+        with open(METRICS_LOG_FILE, "a") as f:
+            f.write(line + "\n")
+    if METRICS_FILE:
+        now = time.time()
+        with _METRICS["lock"]:
+            if now - _METRICS["exported"] < METRICS_EXPORT_INTERVAL:
+                return
+            _METRICS["exported"] = now
+        tmp_path = f"{METRICS_FILE}.{os.getpid()}.tmp"
+        with open(tmp_path, "w") as f:
+            f.write(metrics_prometheus())
+        os.replace(tmp_path, METRICS_FILE)
+
+def load_json_file(filename, default_value):
+    if os.path.exists(filename):
+        try:
+            with span("load_json_file", file=filename), open(filename, "r") as f:
+                count_metric("file_reads", file=filename)
+                count_metric("file_read_bytes", os.fstat(f.fileno()).st_size, file=filename)
+                return json.load(f)
+        except (json.JSONDecodeError, IOError) as e:
+            reporter.warning(f"Could not load {filename}: {e}. Using defaults.")
+            return default_value
+    else:
+        save_json_file(filename, default_value)
+        return default_value
+
+def save_json_file(filename, data):
+    """
+    Writes data to a temporary file, fsyncs it and renames it over filename while holding
+    the file's lock, so readers never see a truncated file and concurrent writers serialise.
+    """
+    try:
+        with span("save_json_file", file=filename), file_lock(filename):
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+            try:
+                with os.fdopen(fd, "w") as f:
+                    json.dump(data, f, indent=4)
+                    f.flush()
+                    os.fsync(f.fileno())
+                    count_metric("file_writes", file=filename)
+                    count_metric("file_write_bytes", f.tell(), file=filename)
+                os.replace(tmp_path, filename)
+            except BaseException:
+                os.remove(tmp_path)
+                raise
+    except IOError as e:
+        reporter.error(f"Could not save to {filename}: {e}")
+
+def load_user_config():
+    """Returns every user as {"users": {username: settings}}; prefer load_user_record() for one user."""
+    with closing(connect_user_directory()) as conn:
+        rows = conn.execute(f"SELECT {', '.join(_USER_DIRECTORY_COLUMNS)} FROM users ORDER BY rowid").fetchall()
+    return {"users": {row[0]: _user_from_row(row) for row in rows}}
+
+def save_user_config(data):
+    """Replaces every user record in one transaction."""
+    with closing(connect_user_directory()) as conn, conn:
+        conn.execute("DELETE FROM users")
+        for username, user in data.get("users", {}).items():
+            try:
+                conn.execute(_UPSERT_USER_SQL, _user_row(username, user))
+            except sqlite3.IntegrityError:
+                # Duplicate email: keep the first user, like the old linear scan did
+                continue
+        _bump_users_version(conn)
+
+WORKOUT_RESULT_COLUMNS = ["User", "Date", "Theme", "Warm-Up", "Strength", "WOD", "Result", "Calories Burned", "Average Heart Rate", "Max Heart Rate"]
+# DataFrame column -> workout_results table column
+_WORKOUT_RESULT_DB_COLUMNS = {
+    "User": "user",
+    "Date": "date",
+    "Theme": "theme",
+    "Warm-Up": "warm_up",
+    "Strength": "strength",
+    "WOD": "wod",
+    "Result": "result",
+    "Calories Burned": "calories",
+    "Average Heart Rate": "avg_hr",
+    "Max Heart Rate": "max_hr"
+}
+_INSERT_WORKOUT_RESULT_SQL = (
+    f"INSERT INTO workout_results ({', '.join(_WORKOUT_RESULT_DB_COLUMNS.values())}) "
+    f"VALUES ({', '.join('?' * len(_WORKOUT_RESULT_DB_COLUMNS))})"
+)
+
+@functools.lru_cache(maxsize=None)
+def _workout_results_store():
+    """Process-wide flag so the results schema/migration check runs once per process."""
+    return {"lock": threading.Lock(), "ready": False}
+
+def _migrate_workout_results_csv(conn):
+    """One-time import of the legacy workout_results_new.csv into the SQLite store."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'csv_migrated'").fetchone() is None:
+            if os.path.exists(WORKOUT_RESULTS_FILE):
+                import pandas as pd
+                df = pd.read_csv(WORKOUT_RESULTS_FILE).reindex(columns=WORKOUT_RESULT_COLUMNS)
+                df = df.astype(object).where(pd.notna(df), None)
+                conn.executemany(
+                    _INSERT_WORKOUT_RESULT_SQL,
+                    df.itertuples(index=False, name=None)
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('csv_migrated', ?)", (str(datetime.datetime.now()),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def connect_workout_results():
+    """
+    Returns a connection to the results store: an append-only table indexed on (user, date).
+    WAL mode lets sessions read while a single writer commits.
+    """
+    conn = open_sqlite(WORKOUT_RESULTS_DB_FILE)
+    store = _workout_results_store()
+    if not store["ready"]:
+        with store["lock"]:
+            if not store["ready"]:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS workout_results ("
+                    "id INTEGER PRIMARY KEY AUTOINCREMENT, user TEXT NOT NULL, date TEXT NOT NULL, "
+                    "theme TEXT, warm_up TEXT, strength TEXT, wod TEXT, result TEXT, "
+                    "calories REAL, avg_hr REAL, max_hr REAL)"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_workout_results_user_date ON workout_results (user, date)")
+                # Personal-best recomputation looks up every attempt at one WOD
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_workout_results_user_wod ON workout_results (user, wod)")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('results_version', 0)")
+                conn.executescript(_RESULT_ANALYTICS_SCHEMA)
+                conn.commit()
+                _migrate_workout_results_csv(conn)
+                _migrate_result_analytics(conn)
+                store["ready"] = True
+    return conn
+
+def _bump_results_version(conn):
+    """Marks the results as changed; must run inside the writing transaction."""
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'results_version'")
+
+def workout_results_version():
+    """Returns a counter that increases on every results write, from any process."""
+    with closing(connect_workout_results()) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'results_version'").fetchone()
+    return int(row[0]) if row else 0
+
+@functools.lru_cache(maxsize=None)
+def _results_index_cache():
+    """Process-wide {user: (results_version, {date: result row})}, shared by every session."""
+    return {"lock": threading.Lock(), "indexes": {}}
+
+def load_user_results_index(user):
+    """
+    Returns {date_str: result row dict} for user, keeping the first result recorded per date.
+    The index is rebuilt only when workout_results_version() changed since it was built.
+    """
+    cache = _results_index_cache()
+    version = workout_results_version()
+    with cache["lock"]:
+        cached = cache["indexes"].get(user)
+        if cached is not None and cached[0] == version:
+            count_metric("cache_hits", cache="results_index")
+            return cached[1]
+    count_metric("cache_misses", cache="results_index")
+    select = ", ".join(f'{db_col} AS "{col}"' for col, db_col in _WORKOUT_RESULT_DB_COLUMNS.items())
+    index = {}
+    with closing(connect_workout_results()) as conn:
+        cursor = conn.execute(f"SELECT {select} FROM workout_results WHERE user = ? ORDER BY id", (user,))
+        names = [column[0] for column in cursor.description]
+        for row in cursor:
+            index.setdefault(row[1], dict(zip(names, row)))
+    with cache["lock"]:
+        cache["indexes"][user] = (version, index)
+    return index
+
+def has_workout_results(user):
+    """True if the user has recorded any result; a single (user, date) index probe."""
+    with closing(connect_workout_results()) as conn:
+        return conn.execute("SELECT 1 FROM workout_results WHERE user = ? LIMIT 1", (user,)).fetchone() is not None
+
+def load_user_results_range(user, start_date_str, end_date_str):
+    """
+    Returns {date_str: result row dict} for the user's results dated in [start, end], keeping the
+    first result per date like load_user_results_index(), via one (user, date) index range scan.
+    """
+    select = ", ".join(f'{db_col} AS "{col}"' for col, db_col in _WORKOUT_RESULT_DB_COLUMNS.items())
+    end_exclusive = str(datetime.date.fromisoformat(end_date_str) + datetime.timedelta(days=1))
+    with closing(connect_workout_results()) as conn:
+        cursor = conn.execute(
+            f"SELECT {select} FROM workout_results WHERE user = ? AND date >= ? AND date < ? ORDER BY id",
+            (user, start_date_str, end_exclusive)
+        )
+        names = [column[0] for column in cursor.description]
+        index = {}
+        for row in cursor:
+            index.setdefault(row[1], dict(zip(names, row)))
+    return index
+
+@timed("load_workout_results")
+def load_workout_results(user=None):
+    """Returns workout results as a DataFrame; pass user to read only that user's rows via the index."""
+    import pandas as pd
+    select = ", ".join(f'{db_col} AS "{col}"' for col, db_col in _WORKOUT_RESULT_DB_COLUMNS.items())
+    try:
+        with closing(connect_workout_results()) as conn:
+            if user is None:
+                return pd.read_sql_query(f"SELECT {select} FROM workout_results ORDER BY id", conn)
+            return pd.read_sql_query(f"SELECT {select} FROM workout_results WHERE user = ? ORDER BY id", conn, params=(user,))
+    except (sqlite3.Error, pd.errors.DatabaseError) as e:
+        reporter.warning(f"Could not load {WORKOUT_RESULTS_DB_FILE}: {e}. Starting fresh.")
+        return pd.DataFrame(columns=WORKOUT_RESULT_COLUMNS)
+
+def save_workout_result(user, date, wod, result, calories, avg_hr, max_hr):
+    """Appends one result row; the cost does not depend on how many results are stored."""
+    row = (
+        user,
+        date,
+        wod.get("Theme", "N/A"),
+        wod.get("Warm-Up", "N/A"),
+        wod.get("Strength", "N/A"),
+        wod.get("WOD", "N/A"),
+        result,
+        calories,
+        avg_hr,
+        max_hr
+    )
+    try:
+        with closing(connect_workout_results()) as conn, conn:
+            conn.execute(
+                _INSERT_WORKOUT_RESULT_SQL,
+                row
+            )
+            _apply_result_analytics(conn, row, 1)
+            _bump_results_version(conn)
+    except sqlite3.Error as e:
+        reporter.error(f"Could not save workout results: {e}")
+
+_UPDATABLE_RESULT_FIELDS = ("theme", "warm_up", "strength", "wod", "result", "calories", "avg_hr", "max_hr")
+
+def _validate_result_fields(fields):
+    unknown = set(fields) - set(_UPDATABLE_RESULT_FIELDS)
+    if unknown:
+        raise ValueError(f"Unknown workout result fields: {', '.join(sorted(unknown))}")
+    if "result" in fields and np.isnan(parse_result_str(fields["result"])):
+        raise ValueError("Invalid input format. Please enter time as MM:SS or a number for reps.")
+
+def _update_workout_result_rows(conn, user, date, fields):
+    """Applies fields to every row of (user, date) through the (user, date) index; returns the row count."""
+    columns = ", ".join(_WORKOUT_RESULT_DB_COLUMNS.values())
+    old_rows = conn.execute(f"SELECT id, {columns} FROM workout_results WHERE user = ? AND date = ?", (user, date)).fetchall()
+    if not old_rows:
+        return 0
+    assignments = ", ".join(f"{field} = ?" for field in fields)
+    names = list(_WORKOUT_RESULT_DB_COLUMNS.values())
+    for old_row in old_rows:
+        # Row by row, so a recomputed best sees exactly the rows updated so far
+        conn.execute(f"UPDATE workout_results SET {assignments} WHERE id = ?", list(fields.values()) + [old_row[0]])
+        old_row = old_row[1:]
+        new_row = tuple(fields.get(name, value) for name, value in zip(names, old_row))
+        # Add before removing, so a recomputed best already sees the updated row exactly once
+        _apply_result_analytics(conn, new_row, 1)
+        _apply_result_analytics(conn, old_row, -1)
+    return len(old_rows)
+
+def update_workout_result(user, date, **fields):
+    """
+    Updates the given columns (theme, warm_up, strength, wod, result, calories, avg_hr,
+    max_hr) of the user's result(s) for date in place. The cost depends on the rows changed,
+    not on the size of the store. Raises ValueError for unknown fields or an invalid result;
+    returns the number of rows updated.
+    """
+    return update_workout_results([(user, date, fields)])
+
+def update_workout_results(updates):
+    """Batch form of update_workout_result(): (user, date, fields) triples, applied in one transaction."""
+    updates = [(user, date, dict(fields)) for user, date, fields in updates]
+    for _, _, fields in updates:
+        _validate_result_fields(fields)
+    updated = 0
+    with closing(connect_workout_results()) as conn, conn:
+        for user, date, fields in updates:
+            if fields:
+                updated += _update_workout_result_rows(conn, user, date, fields)
+        if updated:
+            _bump_results_version(conn)
+    return updated
+
+def save_workout_results(df):
+    """Replaces every stored result with the rows of df in a single transaction."""
+    import pandas as pd
+    df = df.reindex(columns=WORKOUT_RESULT_COLUMNS)
+    df = df.astype(object).where(pd.notna(df), None)
+    import_workout_results(df.itertuples(index=False, name=None), replace=True)
+
+def import_workout_results(rows, replace=False):
+    """
+    Bulk-appends result row tuples (in WORKOUT_RESULT_COLUMNS order) in one transaction and
+    rebuilds the analytics tables, e.g. to seed a store; replace=True drops every stored result
+    first. rows may be any iterable, so large imports can be streamed. Returns the row count.
+    """
+    with closing(connect_workout_results()) as conn, conn:
+        if replace:
+            conn.execute("DELETE FROM workout_results")
+        before = conn.total_changes
+        conn.executemany(_INSERT_WORKOUT_RESULT_SQL, rows)
+        count = conn.total_changes - before
+        _rebuild_result_analytics(conn)
+        _bump_results_version(conn)
+    return count
+
+# --- Results analytics: running aggregates kept in step with workout_results ---
+# Every write applies its row to these tables in the same transaction, so queries never scan
+# the full history: result_days/result_periods hold per-day, per-week and per-month sums,
+# result_bests the best result per (user, WOD), and result_streaks runs of consecutive days.
+_RESULT_ANALYTICS_METRICS = ["calories", "avg_hr", "max_hr"]
+_RESULT_ANALYTICS_SUMS = ", ".join(f"{m}_sum REAL NOT NULL DEFAULT 0, {m}_n INTEGER NOT NULL DEFAULT 0" for m in _RESULT_ANALYTICS_METRICS)
+_RESULT_ANALYTICS_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS result_days (
+    user TEXT NOT NULL, date TEXT NOT NULL, n INTEGER NOT NULL, {_RESULT_ANALYTICS_SUMS},
+    PRIMARY KEY (user, date)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS result_periods (
+    user TEXT NOT NULL, period TEXT NOT NULL, start TEXT NOT NULL, n INTEGER NOT NULL, {_RESULT_ANALYTICS_SUMS},
+    PRIMARY KEY (user, period, start)) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS result_bests (
+    user TEXT NOT NULL, wod TEXT NOT NULL, best REAL, best_date TEXT, lower_is_better INTEGER NOT NULL,
+    attempts INTEGER NOT NULL, PRIMARY KEY (user, wod));
+CREATE TABLE IF NOT EXISTS result_streaks (
+    user TEXT NOT NULL, start INTEGER NOT NULL, end INTEGER NOT NULL, length INTEGER NOT NULL,
+    PRIMARY KEY (user, start)) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS idx_result_streaks_user_length ON result_streaks (user, length);
+CREATE INDEX IF NOT EXISTS idx_result_streaks_user_end ON result_streaks (user, end);
+"""
+_RESULT_TIME_PATTERN = re.compile(r"^(\d+):(\d+)$")
+
+def _result_metric_values(row):
+    """Numeric (calories, avg_hr, max_hr) of a workout_results row tuple; None where missing."""
+    values = []
+    for value in row[7:10]:
+        try:
+            value = float(value)
+        except (TypeError, ValueError):
+            value = None
+        values.append(None if value is None or math.isnan(value) else value)
+    return values
+
+def _upsert_result_sums(conn, table, key_columns, key, sign, values):
+    """Adds (sign=1) or removes (sign=-1) one row's metrics from a sums table; returns the new count."""
+    where = " AND ".join(f"{column} = ?" for column in key_columns)
+    sums = []
+    for value in values:
+        sums += [sign * (value or 0.0), sign * (value is not None)]
+    updates = ", ".join(f"{m}_sum = {m}_sum + ?, {m}_n = {m}_n + ?" for m in _RESULT_ANALYTICS_METRICS)
+    cursor = conn.execute(f"UPDATE {table} SET n = n + ?, {updates} WHERE {where}", [sign] + sums + list(key))
+    if cursor.rowcount == 0:
+        if sign < 0:
+            return 0
+        columns = ", ".join(key_columns + ["n"] + [f"{m}_{part}" for m in _RESULT_ANALYTICS_METRICS for part in ("sum", "n")])
+        conn.execute(f"INSERT INTO {table} ({columns}) VALUES ({', '.join('?' * (len(key) + 1 + len(sums)))})", list(key) + [1] + sums)
+        return 1
+    n = conn.execute(f"SELECT n FROM {table} WHERE {where}", key).fetchone()[0]
+    if n <= 0:
+        conn.execute(f"DELETE FROM {table} WHERE {where}", key)
+    return n
+
+def _add_streak_day(conn, user, ordinal):
+    """Merges ordinal into the user's runs of consecutive days in O(log n)."""
+    before = conn.execute("SELECT start FROM result_streaks WHERE user = ? AND end = ?", (user, ordinal - 1)).fetchone()
+    after = conn.execute("SELECT end FROM result_streaks WHERE user = ? AND start = ?", (user, ordinal + 1)).fetchone()
+    start = before[0] if before else ordinal
+    end = after[0] if after else ordinal
+    if after:
+        conn.execute("DELETE FROM result_streaks WHERE user = ? AND start = ?", (user, ordinal + 1))
+    conn.execute(
+        "INSERT OR REPLACE INTO result_streaks (user, start, end, length) VALUES (?, ?, ?, ?)",
+        (user, start, end, end - start + 1)
+    )
+
+def _remove_streak_day(conn, user, ordinal):
+    """Splits the run containing ordinal around it."""
+    run = conn.execute(
+        "SELECT start, end FROM result_streaks WHERE user = ? AND start <= ? ORDER BY start DESC LIMIT 1",
+        (user, ordinal)
+    ).fetchone()
+    if run is None or run[1] < ordinal:
+        return
+    start, end = run
+    conn.execute("DELETE FROM result_streaks WHERE user = ? AND start = ?", (user, start))
+    for part_start, part_end in ((start, ordinal - 1), (ordinal + 1, end)):
+        if part_start <= part_end:
+            conn.execute(
+                "INSERT INTO result_streaks (user, start, end, length) VALUES (?, ?, ?, ?)",
+                (user, part_start, part_end, part_end - part_start + 1)
+            )
+
+def _wod_lower_is_better(wod):
+    """Timed WODs (For Time, Chipper, Rounds For Time) are won by the lowest time; others by reps/rounds."""
+    spec = wod_spec(wod)
+    if spec.format is None:
+        return "time" in wod.lower()
+    return spec.format not in ("AMRAP", "EMOM")
+
+def _result_score(result, lower_is_better):
+    """Comparable value of a result string, or None if missing or not of the WOD's kind (time vs reps)."""
+    if not isinstance(result, str) or bool(_RESULT_TIME_PATTERN.match(result)) != lower_is_better:
+        return None
+    value = parse_result_str(result)
+    if isinstance(value, float) and math.isnan(value):
+        return None
+    return float(value)
+
+def _recompute_result_best(conn, user, wod):
+    """Re-derives one (user, WOD) best from its rows; only needed when the best row is removed."""
+    lower_is_better = _wod_lower_is_better(wod)
+    best = None
+    attempts = 0
+    for date, result in conn.execute("SELECT date, result FROM workout_results WHERE user = ? AND wod = ? ORDER BY id", (user, wod)):
+        attempts += 1
+        value = _result_score(result, lower_is_better)
+        if value is not None and (best is None or (value < best[0] if lower_is_better else value > best[0])):
+            best = (value, date)
+    if attempts == 0:
+        conn.execute("DELETE FROM result_bests WHERE user = ? AND wod = ?", (user, wod))
+    else:
+        value, date = best or (None, None)
+        conn.execute(
+            "INSERT OR REPLACE INTO result_bests (user, wod, best, best_date, lower_is_better, attempts) VALUES (?, ?, ?, ?, ?, ?)",
+            (user, wod, value, date, int(lower_is_better), attempts)
+        )
+
+def _apply_result_analytics(conn, row, sign):
+    """
+    Adds (sign=1) or removes (sign=-1) one workout_results row tuple, in insert-column order,
+    from the analytics tables. Removal must run after the row itself was changed or deleted.
+    """
+    user, date, wod, result = row[0], row[1], row[5], row[6]
+    try:
+        day = datetime.date.fromisoformat(str(date)[:10])
+    except ValueError:
+        day = None
+    if day is not None:
+        values = _result_metric_values(row)
+        n = _upsert_result_sums(conn, "result_days", ["user", "date"], (user, str(day)), sign, values)
+        week = day - datetime.timedelta(days=day.weekday())
+        _upsert_result_sums(conn, "result_periods", ["user", "period", "start"], (user, "week", str(week)), sign, values)
+        _upsert_result_sums(conn, "result_periods", ["user", "period", "start"], (user, "month", str(day.replace(day=1))), sign, values)
+        if sign > 0 and n == 1:
+            _add_streak_day(conn, user, day.toordinal())
+        elif sign < 0 and n <= 0:
+            _remove_streak_day(conn, user, day.toordinal())
+
+    if not isinstance(wod, str) or not wod:
+        return
+    lower_is_better = _wod_lower_is_better(wod)
+    value = _result_score(result, lower_is_better)
+    best = conn.execute("SELECT best, lower_is_better, attempts FROM result_bests WHERE user = ? AND wod = ?", (user, wod)).fetchone()
+    if sign > 0:
+        if best is None:
+            conn.execute(
+                "INSERT INTO result_bests (user, wod, best, best_date, lower_is_better, attempts) VALUES (?, ?, ?, ?, ?, 1)",
+                (user, wod, value, date if value is not None else None, int(lower_is_better))
+            )
+        elif value is not None and (best[0] is None or (value < best[0] if lower_is_better else value > best[0])):
+            conn.execute(
+                "UPDATE result_bests SET best = ?, best_date = ?, attempts = attempts + 1 WHERE user = ? AND wod = ?",
+                (value, date, user, wod)
+            )
+        else:
+            conn.execute("UPDATE result_bests SET attempts = attempts + 1 WHERE user = ? AND wod = ?", (user, wod))
+    elif best is not None:
+        if best[2] <= 1 or (value is not None and value == best[0]):
+            _recompute_result_best(conn, user, wod)
+        else:
+            conn.execute("UPDATE result_bests SET attempts = attempts - 1 WHERE user = ? AND wod = ?", (user, wod))
+
+def _rebuild_result_analytics(conn, batch_rows=50000):
+    """Recomputes every analytics table from workout_results, batch_rows rows at a time; used after full rewrites."""
+    for table in ("result_days", "result_periods", "result_bests", "result_streaks"):
+        conn.execute(f"DELETE FROM {table}")
+    columns = ", ".join(_WORKOUT_RESULT_DB_COLUMNS.values())
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            f"SELECT id, {columns} FROM workout_results WHERE id > ? ORDER BY id LIMIT ?", (last_id, batch_rows)
+        ).fetchall()
+        if not rows:
+            break
+        for row in rows:
+            _apply_result_analytics(conn, row[1:], 1)
+        last_id = rows[-1][0]
+
+def _migrate_result_analytics(conn):
+    """One-time build of the analytics tables for results stored before they existed."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'analytics_built'").fetchone() is None:
+            _rebuild_result_analytics(conn)
+            conn.execute("INSERT INTO meta (key, value) VALUES ('analytics_built', ?)", (str(datetime.datetime.now()),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def _result_means(row):
+    return {m: (row[2 * i] / row[2 * i + 1] if row[2 * i + 1] else None) for i, m in enumerate(_RESULT_ANALYTICS_METRICS)}
+
+def result_period_means(user, period, day=None):
+    """
+    Mean calories/avg_hr/max_hr over the "week" (Monday-based) or "month" containing day
+    (default today), plus the workout count; a single primary-key lookup.
+    """
+    day = day or datetime.date.today()
+    start = day - datetime.timedelta(days=day.weekday()) if period == "week" else day.replace(day=1)
+    columns = ", ".join(f"{m}_sum, {m}_n" for m in _RESULT_ANALYTICS_METRICS)
+    with closing(connect_workout_results()) as conn:
+        row = conn.execute(
+            f"SELECT {columns}, n FROM result_periods WHERE user = ? AND period = ? AND start = ?",
+            (user, period, str(start))
+        ).fetchone()
+    if row is None:
+        return {**{m: None for m in _RESULT_ANALYTICS_METRICS}, "workouts": 0}
+    return {**_result_means(row), "workouts": row[-1]}
+
+def result_rolling_means(user, days=7, end=None):
+    """Trailing means over the days-long window ending at end (default today); reads at most days rows."""
+    end = end or datetime.date.today()
+    start = end - datetime.timedelta(days=days - 1)
+    columns = ", ".join(f"SUM({m}_sum), SUM({m}_n)" for m in _RESULT_ANALYTICS_METRICS)
+    with closing(connect_workout_results()) as conn:
+        row = conn.execute(
+            f"SELECT {columns}, SUM(n) FROM result_days WHERE user = ? AND date BETWEEN ? AND ?",
+            (user, str(start), str(end))
+        ).fetchone()
+    return {**_result_means(row), "workouts": row[-1] or 0}
+
+def personal_record(user, wod):
+    """
+    Returns {"best", "date", "lower_is_better", "attempts"} for a WOD string (or record), or
+    None if the user never logged it.
+    """
+    wod = wod.get("WOD", "") if isinstance(wod, dict) else wod
+    with closing(connect_workout_results()) as conn:
+        row = conn.execute(
+            "SELECT best, best_date, lower_is_better, attempts FROM result_bests WHERE user = ? AND wod = ?",
+            (user, wod)
+        ).fetchone()
+    if row is None:
+        return None
+    return {"best": row[0], "date": row[1], "lower_is_better": bool(row[2]), "attempts": row[3]}
+
+def result_streaks(user, today=None):
+    """Returns (current streak, longest streak) in days; current counts a run ending today or yesterday."""
+    today = (today or datetime.date.today()).toordinal()
+    with closing(connect_workout_results()) as conn:
+        current = conn.execute(
+            "SELECT length FROM result_streaks WHERE user = ? AND end >= ? ORDER BY end DESC LIMIT 1",
+            (user, today - 1)
+        ).fetchone()
+        longest = conn.execute(
+            "SELECT MAX(length) FROM result_streaks WHERE user = ?",
+            (user,)
+        ).fetchone()
+    return (current[0] if current else 0), (longest[0] or 0)
+
+def open_sqlite(filename):
+    """Opens a SQLite connection in WAL mode so readers never block the single writer."""
+    conn = sqlite3.connect(filename, timeout=30)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    return conn
+
+def reset_stores():
+    """
+    Forgets every process-wide store flag and cache (schema checks, catalog, indexes, per-user
+    caches, the user writer and job runner), so the next call opens the stores relative to the
+    current working directory. For tools and tests that switch data directories in one process.
+    """
+    holders = (
+        _workout_results_store, _results_index_cache, _wod_calendar_store, _wod_database_cache,
+        _user_directory_store, _user_record_writer, _movement_load_cache, _movement_index_cache,
+        _jobs_store, _job_runner,
+    )
+    if _job_runner.cache_info().currsize:
+        _job_runner().stop()
+    for holder in holders:
+        holder.cache_clear()
+
+@functools.lru_cache(maxsize=None)
+def _wod_calendar_store():
+    """Process-wide flag so the calendar schema/migration check runs once per process."""
+    return {"lock": threading.Lock(), "ready": False}
+
+def _migrate_wod_calendar_json(conn):
+    """One-time import of the legacy wod_calendar_new.json into the SQLite store."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone() is None:
+            if os.path.exists(WOD_CALENDAR_FILE):
+                calendar = load_json_file(WOD_CALENDAR_FILE, {})
+                conn.executemany(
+                    "INSERT OR IGNORE INTO wod_calendar (date, wod) VALUES (?, ?)",
+                    [(date_str, json.dumps(wod)) for date_str, wod in calendar.items()]
+                )
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(datetime.datetime.now()),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def connect_wod_calendar():
+    """
+    Returns a connection to the calendar store: the shared calendar (one row per date) and
+    per-user calendars (one row per user and date) that take precedence over it.
+    Creates the schema and migrates the legacy JSON calendar on first use.
+    """
+    conn = open_sqlite(WOD_CALENDAR_DB_FILE)
+    store = _wod_calendar_store()
+    if not store["ready"]:
+        with store["lock"]:
+            if not store["ready"]:
+                conn.execute("CREATE TABLE IF NOT EXISTS wod_calendar (date TEXT PRIMARY KEY, wod TEXT NOT NULL)")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS wod_calendar_overrides "
+                    "(user TEXT NOT NULL, date TEXT NOT NULL, wod TEXT NOT NULL, PRIMARY KEY (user, date))"
+                )
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS user_wod_calendar "
+                    "(user TEXT NOT NULL, date TEXT NOT NULL, wod TEXT NOT NULL, PRIMARY KEY (user, date)) WITHOUT ROWID"
+                )
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('calendar_version', 0)")
+                conn.commit()
+                _migrate_wod_calendar_json(conn)
+                store["ready"] = True
+    return conn
+
+def _bump_calendar_version(conn):
+    """Marks the calendar (shared, per-user or overrides) as changed; must run inside the writing transaction."""
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'calendar_version'")
+
+def wod_calendar_version():
+    """Returns a counter that increases on every calendar or override write, from any process."""
+    with closing(connect_wod_calendar()) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'calendar_version'").fetchone()
+    return int(row[0]) if row else 0
+
+def load_wod_calendar(user=None):
+    """Returns the whole shared calendar, overlaid with the user's own calendar when user is given."""
+    with closing(connect_wod_calendar()) as conn:
+        rows = conn.execute("SELECT date, wod FROM wod_calendar ORDER BY date").fetchall()
+        if user is not None:
+            rows += conn.execute("SELECT date, wod FROM user_wod_calendar WHERE user = ? ORDER BY date", (user,)).fetchall()
+    return {date_str: json.loads(wod) for date_str, wod in sorted(rows, key=lambda row: row[0])}
+
+def save_wod_calendar(calendar):
+    """Replaces the whole shared calendar in a single transaction."""
+    try:
+        with closing(connect_wod_calendar()) as conn, conn:
+            conn.execute("DELETE FROM wod_calendar")
+            conn.executemany(
+                "INSERT INTO wod_calendar (date, wod) VALUES (?, ?)",
+                [(date_str, json.dumps(wod)) for date_str, wod in calendar.items()]
+            )
+            _bump_calendar_version(conn)
+    except sqlite3.Error as e:
+        reporter.error(f"Could not save WOD calendar: {e}")
+
+def save_user_wod_calendar(user, calendar):
+    """
+    Replaces the user's calendar from the first date in calendar onwards in one transaction;
+    earlier days (and the results recorded against them) are kept.
+    """
+    if not calendar:
+        return
+    with closing(connect_wod_calendar()) as conn, conn:
+        conn.execute("DELETE FROM user_wod_calendar WHERE user = ? AND date >= ?", (user, min(calendar)))
+        conn.executemany(
+            "INSERT INTO user_wod_calendar (user, date, wod) VALUES (?, ?, ?)",
+            [(user, date_str, json.dumps(wod)) for date_str, wod in calendar.items()]
+        )
+        _bump_calendar_version(conn)
+
+def save_wod_calendar_day(date_str, wod, user=None):
+    """Inserts or replaces the WOD for a single date (in the user's calendar when given)."""
+    save_wod_calendar_days({date_str: wod}, user)
+
+def load_wod_calendar_range(start_date_str, end_date_str, user=None):
+    """
+    Returns {date_str: wod} for the stored dates in [start, end], the user's own days taking
+    precedence over the shared calendar; each table is read with one primary-key range scan.
+    """
+    with closing(connect_wod_calendar()) as conn:
+        rows = conn.execute(
+            "SELECT date, wod FROM wod_calendar WHERE date BETWEEN ? AND ? ORDER BY date",
+            (start_date_str, end_date_str)
+        ).fetchall()
+        if user is not None:
+            rows += conn.execute(
+                "SELECT date, wod FROM user_wod_calendar WHERE user = ? AND date BETWEEN ? AND ? ORDER BY date",
+                (user, start_date_str, end_date_str)
+            ).fetchall()
+    return {date_str: json.loads(wod) for date_str, wod in rows}
+
+def save_wod_calendar_days(days, user=None):
+    """Upserts several {date_str: wod} entries in one transaction (in the user's calendar when given)."""
+    try:
+        with closing(connect_wod_calendar()) as conn, conn:
+            if user is None:
+                conn.executemany(
+                    "INSERT INTO wod_calendar (date, wod) VALUES (?, ?) "
+                    "ON CONFLICT(date) DO UPDATE SET wod = excluded.wod",
+                    [(date_str, json.dumps(wod)) for date_str, wod in days.items()]
+                )
+            else:
+                conn.executemany(
+                    "INSERT INTO user_wod_calendar (user, date, wod) VALUES (?, ?, ?) "
+                    "ON CONFLICT(user, date) DO UPDATE SET wod = excluded.wod",
+                    [(user, date_str, json.dumps(wod)) for date_str, wod in days.items()]
+                )
+            _bump_calendar_version(conn)
+    except sqlite3.Error as e:
+        reporter.error(f"Could not save WOD calendar: {e}")
+
+def is_wod_calendar_empty(user=None):
+    """True when neither the shared calendar nor (if given) the user's own calendar has any day."""
+    with closing(connect_wod_calendar()) as conn:
+        if conn.execute("SELECT 1 FROM wod_calendar LIMIT 1").fetchone() is not None:
+            return False
+        if user is None:
+            return True
+        return conn.execute("SELECT 1 FROM user_wod_calendar WHERE user = ? LIMIT 1", (user,)).fetchone() is None
+
+def save_wod_override(user, date_str, wod):
+    try:
+        with closing(connect_wod_calendar()) as conn, conn:
+            conn.execute(
+                "INSERT INTO wod_calendar_overrides (user, date, wod) VALUES (?, ?, ?) "
+                "ON CONFLICT(user, date) DO UPDATE SET wod = excluded.wod",
+                (user, date_str, json.dumps(wod))
+            )
+            _bump_calendar_version(conn)
+    except sqlite3.Error as e:
+        reporter.error(f"Could not save WOD for {date_str}: {e}")
+
+def load_wod_overrides_range(user, start_date_str, end_date_str):
+    """Returns the user's pinned WODs {date_str: wod} in [start, end]."""
+    with closing(connect_wod_calendar()) as conn:
+        rows = conn.execute(
+            "SELECT date, wod FROM wod_calendar_overrides WHERE user = ? AND date BETWEEN ? AND ?",
+            (user, start_date_str, end_date_str)
+        ).fetchall()
+    return {date_str: json.loads(wod) for date_str, wod in rows}
+
+def clear_wod_overrides(user, from_date_str):
+    """Drops the user's pinned WODs on or after from_date_str."""
+    with closing(connect_wod_calendar()) as conn, conn:
+        conn.execute("DELETE FROM wod_calendar_overrides WHERE user = ? AND date >= ?", (user, from_date_str))
+        _bump_calendar_version(conn)
+
+def file_signature(filename):
+    """Returns (mtime_ns, size) for filename, or None if it does not exist."""
+    try:
+        stat = os.stat(filename)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size)
+
+@functools.lru_cache(maxsize=None)
+def _wod_database_cache():
+    """
+    Process-wide holder for the parsed WOD database, shared by every session.
+    The factory is cached, so every call returns the same holder.
+    """
+    return {"lock": threading.Lock(), "signature": None, "data": None, "hits": 0, "misses": 0}
+
+# --- Binary WOD catalog ---
+# Layout: 8-byte magic, uint64 footer offset, uint64 record count, padding to CATALOG_DATA_OFFSET,
+# fixed-width records (_CATALOG_DTYPE), then a JSON footer holding the dictionaries.
+CATALOG_MAGIC = b"WODCAT\x00\x01"
+CATALOG_DATA_OFFSET = 64
+MAX_CATALOG_PARTS = 12
+CATALOG_FIELDS = ("Theme", "Warm-Up", "Strength", "WOD", "Format")
+_CATALOG_WOD_FORMATS = [None, "AMRAP", "EMOM", "For Time", "Chipper", "Rounds For Time"]  # 0 = verbatim text
+_CATALOG_DTYPE = np.dtype([
+    ("theme", "<u2"), ("format", "<u2"), ("wod_format", "<u1"), ("flags", "<u1"),
+    ("count", "<u2"), ("n_parts", "<u1"), ("pad", "<u1"),
+    ("warm_up", "<u4"), ("strength", "<u4"), ("text", "<u4"),
+    ("reps", "<u2", (MAX_CATALOG_PARTS,)), ("movements", "<u2", (MAX_CATALOG_PARTS,))
+])
+CATALOG_FLAG_VERBATIM = 1  # Record stored whole as JSON in the "texts" dictionary
+
+def iter_json_array(filename, chunk_size=1 << 16):
+    """Yields the elements of a top-level JSON array one at a time without loading the whole file."""
+    decoder = json.JSONDecoder()
+    count_metric("file_reads", file=filename)
+    count_metric("file_read_bytes", os.path.getsize(filename), file=filename)
+    with open(filename, "r") as f:
+        buf = f.read(chunk_size)
+        eof = not buf
+        pos = 0
+        started = False
+        while True:
+            while pos < len(buf) and (buf[pos].isspace() or buf[pos] == "," or (not started and buf[pos] == "[")):
+                started = started or buf[pos] == "["
+                pos += 1
+            if pos < len(buf) and buf[pos] == "]":
+                return
+            try:
+                if pos >= len(buf):
+                    raise ValueError("need more data")
+                item, end = decoder.raw_decode(buf, pos)
+                if end == len(buf) and not eof:
+                    raise ValueError("item may continue in the next chunk")
+            except ValueError:
+                if eof:
+                    if not started and not buf[pos:].strip():
+                        return
+                    raise json.JSONDecodeError("Unterminated JSON array", buf, pos)
+                chunk = f.read(chunk_size)
+                eof = not chunk
+                buf = buf[pos:] + chunk
+                pos = 0
+                continue
+            yield item
+            pos = end
+
+class _Dictionary:
+    """Insertion-ordered string -> id table used while writing a catalog."""
+
+    def __init__(self, limit):
+        self.limit = limit
+        self.values = []
+        self.ids = {}
+
+    def encode(self, value):
+        code = self.ids.get(value)
+        if code is None:
+            code = len(self.values)
+            if code >= self.limit:
+                raise ValueError(f"Catalog dictionary overflow ({self.limit} entries)")
+            self.values.append(value)
+            self.ids[value] = code
+        return code
+
+def write_wod_catalog(records, filename, source_signature=None, chunk_rows=4096):
+    """
+    Streams WOD records (any iterable of dicts) into the binary catalog format.
+    Themes, formats, warm-up/strength sentences and movement names are dictionary-encoded;
+    WOD lines are stored as (format, count, reps, movement ids) when they parse, verbatim otherwise.
+    """
+    themes, formats, movements = _Dictionary(1 << 16), _Dictionary(1 << 16), _Dictionary(1 << 16)
+    sentences, texts = _Dictionary(1 << 32), _Dictionary(1 << 32)
+    names = _WOD_SPECS["names"]
+    chunk = np.zeros(chunk_rows, dtype=_CATALOG_DTYPE)
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(b"\x00" * CATALOG_DATA_OFFSET)
+            filled = 0
+            for record in records:
+                chunk[filled] = 0
+                row = chunk[filled]
+                if tuple(record.keys()) != CATALOG_FIELDS or not all(isinstance(record[k], str) for k in CATALOG_FIELDS):
+                    row["flags"] = CATALOG_FLAG_VERBATIM
+                    row["text"] = texts.encode(json.dumps(record))
+                else:
+                    row["theme"] = themes.encode(record["Theme"])
+                    row["format"] = formats.encode(record["Format"])
+                    row["warm_up"] = sentences.encode(record["Warm-Up"])
+                    row["strength"] = sentences.encode(record["Strength"])
+                    spec = wod_spec(record)
+                    if spec.format is None or len(spec.parts) > MAX_CATALOG_PARTS:
+                        row["text"] = texts.encode(record["WOD"])
+                    else:
+                        row["wod_format"] = _CATALOG_WOD_FORMATS.index(spec.format)
+                        row["count"] = spec.duration if spec.duration is not None else (spec.rounds or 0)
+                        row["n_parts"] = len(spec.parts)
+                        for j, (reps, movement) in enumerate(spec.parts):
+                            row["reps"][j] = reps
+                            row["movements"][j] = movements.encode(names[movement])
+                filled += 1
+                count += 1
+                if filled == chunk_rows:
+                    f.write(chunk.tobytes())
+                    filled = 0
+            f.write(chunk[:filled].tobytes())
+            footer_offset = f.tell()
+            f.write(json.dumps({
+                "count": count,
+                "dtype": _CATALOG_DTYPE.descr,
+                "source_signature": source_signature,
+                "themes": themes.values,
+                "formats": formats.values,
+                "movements": movements.values,
+                "sentences": sentences.values,
+                "texts": texts.values
+            }).encode())
+            f.seek(0)
+            f.write(CATALOG_MAGIC + np.array([footer_offset, count], dtype="<u8").tobytes())
+            f.flush()
+            os.fsync(f.fileno())
+            count_metric("file_writes", file=filename)
+            count_metric("file_write_bytes", os.fstat(f.fileno()).st_size, file=filename)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+def convert_json_to_catalog(json_filename=WOD_DATABASE_FILE, catalog_filename=WOD_CATALOG_FILE):
+    """Streams a WOD database JSON file into a binary catalog; returns the number of records."""
+    return write_wod_catalog(iter_json_array(json_filename), catalog_filename, file_signature(json_filename))
+
+class WodCatalog:
+    """
+    Read-only, memory-mapped view of a binary WOD catalog. Records are decoded into the usual
+    {"Theme", "Warm-Up", "Strength", "WOD", "Format"} dicts only when accessed, so opening a
+    catalog costs the same regardless of its size apart from the dictionaries.
+    """
+
+    def __init__(self, filename):
+        with open(filename, "rb") as f:
+            head = f.read(24)
+            if head[:8] != CATALOG_MAGIC:
+                raise ValueError(f"{filename} is not a WOD catalog")
+            footer_offset, count = np.frombuffer(head[8:24], dtype="<u8").tolist()
+            f.seek(footer_offset)
+            footer = json.loads(f.read().decode())
+        self.filename = filename
+        self.source_signature = tuple(footer["source_signature"]) if footer["source_signature"] else None
+        self.themes = footer["themes"]
+        self.formats = footer["formats"]
+        self.movements = footer["movements"]
+        self.sentences = footer["sentences"]
+        self.texts = footer["texts"]
+        self._movement_ids = [movement_id(name) for name in self.movements]
+        self._theme_indices = {}
+        if count:
+            self.records = np.memmap(filename, dtype=_CATALOG_DTYPE, mode="r", offset=CATALOG_DATA_OFFSET, shape=(count,))
+        else:
+            self.records = np.zeros(0, dtype=_CATALOG_DTYPE)
+
+    def __len__(self):
+        return len(self.records)
+
+    def __iter__(self):
+        for i in range(len(self.records)):
+            yield self[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self[j] for j in range(*i.indices(len(self.records)))]
+        row = self.records[int(i)]
+        if row["flags"] & CATALOG_FLAG_VERBATIM:
+            return json.loads(self.texts[row["text"]])
+        wod_format = _CATALOG_WOD_FORMATS[row["wod_format"]]
+        if wod_format is None:
+            wod = self.texts[row["text"]]
+        else:
+            n_parts = row["n_parts"]
+            parts = zip(row["reps"][:n_parts].tolist(), [self._movement_ids[m] for m in row["movements"][:n_parts].tolist()])
+            if wod_format in ("AMRAP", "EMOM"):
+                spec = WodSpec(wod_format, parts, duration=int(row["count"]))
+            elif wod_format == "Chipper":
+                spec = WodSpec(wod_format, parts)
+            else:
+                spec = WodSpec(wod_format, parts, rounds=int(row["count"]))
+            wod = remember_wod_spec(spec)
+        return {
+            "Theme": self.themes[row["theme"]],
+            "Warm-Up": self.sentences[row["warm_up"]],
+            "Strength": self.sentences[row["strength"]],
+            "WOD": wod,
+            "Format": self.formats[row["format"]]
+        }
+
+    def with_theme(self, themes):
+        """
+        The records whose theme is in themes, as a sequence that decodes a record only when it
+        is indexed. The matching positions are found once per catalog and set of themes.
+        """
+        key = frozenset(themes)
+        indices = self._theme_indices.get(key)
+        if indices is None:
+            codes = [i for i, theme in enumerate(self.themes) if theme in key]
+            verbatim = (self.records["flags"] & CATALOG_FLAG_VERBATIM) != 0
+            matches = np.flatnonzero(np.isin(self.records["theme"], codes) & ~verbatim).tolist()
+            indices = matches + [i for i in np.flatnonzero(verbatim).tolist() if self[i].get("Theme") in key]
+            self._theme_indices[key] = indices
+        return CatalogSelection(self, indices)
+
+class CatalogSelection:
+    """Read-only sequence of the catalog records at indices, decoded on access."""
+
+    def __init__(self, catalog, indices):
+        self.catalog = catalog
+        self.indices = indices
+
+    def __len__(self):
+        return len(self.indices)
+
+    def __iter__(self):
+        for i in self.indices:
+            yield self.catalog[i]
+
+    def __getitem__(self, i):
+        if isinstance(i, slice):
+            return [self.catalog[j] for j in self.indices[i]]
+        return self.catalog[self.indices[int(i)]]
+
+def write_json_array(records, filename):
+    """
+    Streams an iterable of records to filename in the same layout as json.dump(list, indent=4),
+    replacing the file atomically once complete. Returns the number of records written.
+    """
+    count = 0
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(filename)), suffix=".tmp")
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.write("[")
+            for record in records:
+                f.write(",\n    " if count else "\n    ")
+                f.write(json.dumps(record, indent=4).replace("\n", "\n    "))
+                count += 1
+            f.write("\n]" if count else "]")
+            f.flush()
+            os.fsync(f.fileno())
+            count_metric("file_writes", file=filename)
+            count_metric("file_write_bytes", f.tell(), file=filename)
+        os.replace(tmp_path, filename)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+        raise
+    return count
+
+def export_wod_catalog(catalog_filename=WOD_CATALOG_FILE, json_filename=WOD_DATABASE_FILE):
+    """Streams a binary catalog back out as the JSON list written by save_wod_database()."""
+    write_json_array(WodCatalog(catalog_filename), json_filename)
+
+def find_wods_by_theme(wod_database, themes):
+    """The WODs whose theme is in themes: a list for a list database, a lazy CatalogSelection for a catalog."""
+    if isinstance(wod_database, list):
+        return [w for w in wod_database if w['Theme'] in themes]
+    return wod_database.with_theme(themes)
+
+def _open_wod_catalog(signature):
+    """Memory-maps WOD_CATALOG_FILE, first re-converting it if it was built from another JSON version."""
+    try:
+        catalog = WodCatalog(WOD_CATALOG_FILE) if os.path.exists(WOD_CATALOG_FILE) else None
+    except (OSError, ValueError, KeyError):
+        catalog = None
+    if catalog is None or catalog.source_signature != signature:
+        convert_json_to_catalog(WOD_DATABASE_FILE, WOD_CATALOG_FILE)
+        catalog = WodCatalog(WOD_CATALOG_FILE)
+    return catalog
+
+def load_wod_database():
+    """
+    Returns the WOD database as a memory-mapped WodCatalog, converting the JSON file only when
+    its mtime or size changed. The result is shared between sessions and is read-only.
+    """
+    cache = _wod_database_cache()
+    with cache["lock"]:
+        signature = file_signature(WOD_DATABASE_FILE)
+        if signature is not None and signature == cache["signature"]:
+            cache["hits"] += 1
+            count_metric("cache_hits", cache="wod_database")
+            return cache["data"]
+        cache["misses"] += 1
+        count_metric("cache_misses", cache="wod_database")
+        if signature is None:
+            database = load_json_file(WOD_DATABASE_FILE, [])
+        else:
+            try:
+                database = _open_wod_catalog(signature)
+            except (OSError, ValueError) as e:
+                reporter.warning(f"Could not build {WOD_CATALOG_FILE}: {e}. Reading {WOD_DATABASE_FILE} directly.")
+                database = load_json_file(WOD_DATABASE_FILE, [])
+        cache["data"] = database
+        cache["signature"] = file_signature(WOD_DATABASE_FILE)
+        return database
+
+def save_wod_database(database):
+    cache = _wod_database_cache()
+    with cache["lock"]:
+        if not isinstance(database, list):
+            database = list(database)
+        save_json_file(WOD_DATABASE_FILE, database)
+        signature = file_signature(WOD_DATABASE_FILE)
+        try:
+            write_wod_catalog(database, WOD_CATALOG_FILE, signature)
+            cache["data"] = WodCatalog(WOD_CATALOG_FILE)
+        except (OSError, ValueError) as e:
+            reporter.warning(f"Could not build {WOD_CATALOG_FILE}: {e}")
+            cache["data"] = database
+        cache["signature"] = signature
+
+def wod_database_cache_stats():
+    """Returns the hit/miss counters of the shared WOD database cache."""
+    cache = _wod_database_cache()
+    with cache["lock"]:
+        return {"hits": cache["hits"], "misses": cache["misses"], "entries": len(cache["data"] or [])}
+
+def load_global_config():
+    return load_json_file(GLOBAL_CONFIG_FILE, {
+        "cluster_centers": [
+            [300, 900, 200, 600, 500],
+            [200, 600, 150, 400, 300],
+            [100, 300, 80, 200, 100]
+        ],
+        "recommended_wods": {
+            "0": {
+                "Theme": "Leg Day",
+                "Warm-Up": "10 minutes light cardio (e.g., jogging) followed by dynamic leg stretches.",
+                "Strength": "3 sets of 5 Back Squats with light weight to build foundational leg strength.",
+                "WOD": "AMRAP 10 minutes: 5 Push-Ups, 10 Air Squats, 15 Single Unders (jump rope)"
+            },
+            "1": {
+                "Theme": "Back & Core",
+                "Warm-Up": "10 minutes rowing and mobility exercises for the back.",
+                "Strength": "4 sets of 6 Deadlifts focusing on form and controlled motion.",
+                "WOD": "For Time: 3 Rounds of 10 Pull-Ups, 20 GHD Sit-Ups, 30 Double Unders (jump rope)"
+            },
+            "2": {
+                "Theme": "Upper Body Strength",
+                "Warm-Up": "10 minutes of shoulder mobility drills and band work.",
+                "Strength": "5 sets of 5 Bench Press with progressive overload.",
+                "WOD": "EMOM 12 minutes: 3 Power Cleans + 12 Push-Ups (goal: maintain consistent pacing)"
+            },
+            "3": {
+                "Theme": "Cindy",
+                "Warm-Up": "10 minutes of light cardio and dynamic stretching.",
+                "Strength": "N/A",
+                "WOD": "20 Minute AMRAP: 5 Pull-Ups, 10 Push-Ups, 15 Air Squats"
+            }
+            # Add more predefined WODs or logic to generate themed WODs
+        },
+        "themes": [
+            "Leg Day",
+            "Back & Core",
+            "Upper Body Strength",
+            "Cardio Blast",
+            "Full Body",
+            "Olympic Lifting",
+            "Gymnastics Skills",
+            "Strongman",
+            "Cindy",  # Standard WOD
+            # ... add more themes as needed
+        ],
+        "calendar_mode": "stored"
+    })
+
+def save_global_config(data):
+    save_json_file(GLOBAL_CONFIG_FILE, data)
+
+_USER_DIRECTORY_COLUMNS = ["username", "email", "password", "skill_level", "intensity", "variety", "preferred_movements"]
+_INSERT_USER_SQL = (
+    f"INSERT INTO users ({', '.join(_USER_DIRECTORY_COLUMNS)}) VALUES ({', '.join('?' * len(_USER_DIRECTORY_COLUMNS))})"
+)
+_UPSERT_USER_SQL = (
+    f"{_INSERT_USER_SQL} ON CONFLICT(username) DO UPDATE SET "
+    + ", ".join(f"{col} = excluded.{col}" for col in _USER_DIRECTORY_COLUMNS[1:])
+)
+
+def _user_row(username, user):
+    return (
+        username,
+        user.get("email", ""),
+        user.get("password", ""),
+        user.get("skill_level", 3),
+        user.get("intensity", 3),
+        user.get("variety", 3),
+        json.dumps(user.get("preferred_movements", []))
+    )
+
+def _user_from_row(row):
+    user = dict(zip(_USER_DIRECTORY_COLUMNS[1:], row[1:]))
+    user["preferred_movements"] = json.loads(user["preferred_movements"])
+    return user
+
+@functools.lru_cache(maxsize=None)
+def _user_directory_store():
+    """Process-wide flag so the directory schema/migration check runs once per process."""
+    return {"lock": threading.Lock(), "ready": False}
+
+def _migrate_user_config_json(conn):
+    """One-time import of the legacy user_config_new.json into the directory."""
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        if conn.execute("SELECT 1 FROM meta WHERE key = 'json_migrated'").fetchone() is None:
+            if os.path.exists(USER_CONFIG_FILE):
+                for username, user in load_json_file(USER_CONFIG_FILE, {}).get("users", {}).items():
+                    try:
+                        conn.execute(_UPSERT_USER_SQL, _user_row(username, user))
+                    except sqlite3.IntegrityError:
+                        continue
+            conn.execute("INSERT INTO meta (key, value) VALUES ('json_migrated', ?)", (str(datetime.datetime.now()),))
+        conn.execute("COMMIT")
+    except Exception:
+        conn.execute("ROLLBACK")
+        raise
+
+def connect_user_directory():
+    """
+    Returns a connection to the user directory: one row per user keyed by username, with a
+    unique index on email. Commits are fully synchronous so an acknowledged save survives a crash.
+    """
+    conn = open_sqlite(USER_DIRECTORY_DB_FILE)
+    conn.execute("PRAGMA synchronous=FULL")
+    store = _user_directory_store()
+    if not store["ready"]:
+        with store["lock"]:
+            if not store["ready"]:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS users (username TEXT PRIMARY KEY, email TEXT NOT NULL, "
+                    "password TEXT NOT NULL, skill_level INTEGER, intensity INTEGER, variety INTEGER, "
+                    "preferred_movements TEXT NOT NULL)"
+                )
+                conn.execute("CREATE UNIQUE INDEX IF NOT EXISTS idx_users_email ON users (email) WHERE email != ''")
+                conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+                conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('users_version', 0)")
+                conn.commit()
+                _migrate_user_config_json(conn)
+                store["ready"] = True
+    return conn
+
+class UserRecordWriter:
+    """
+    Group-commit writer for single-user updates. A write with no commit in flight commits at
+    once; writes that arrive while a commit is in flight queue up and the first of them to
+    wake commits them all in one transaction (one fsync). Later writes to the same user within
+    a batch replace earlier ones. Every caller blocks until its batch is durable and sees its
+    own error, if any.
+    """
+
+    def __init__(self):
+        self._cond = threading.Condition()
+        self._committing = False
+        self._pending = {}
+        self._batch = None
+
+    def write(self, username, user, create=False):
+        with self._cond:
+            if create and username in self._pending:
+                raise sqlite3.IntegrityError(f"UNIQUE constraint failed: users.username ({username})")
+            self._pending[username] = (user, create)
+            if self._batch is None:
+                self._batch = {"done": False, "errors": {}}
+            batch = self._batch
+            while self._committing and not batch["done"]:
+                self._cond.wait()
+            leader = not batch["done"]
+            if leader:
+                self._committing = True
+                pending, self._pending = self._pending, {}
+                self._batch = None
+        if leader:
+            try:
+                self._commit(pending, batch["errors"])
+            except BaseException as e:
+                # Nothing in the batch was written; every waiter must see that
+                for name in pending:
+                    batch["errors"].setdefault(name, e)
+                raise
+            finally:
+                with self._cond:
+                    batch["done"] = True
+                    self._committing = False
+                    self._cond.notify_all()
+        if username in batch["errors"]:
+            raise batch["errors"][username]
+
+    def _commit(self, pending, errors):
+        with closing(connect_user_directory()) as conn, conn:
+            for username, (user, create) in pending.items():
+                try:
+                    conn.execute(_INSERT_USER_SQL if create else _UPSERT_USER_SQL, _user_row(username, user))
+                except sqlite3.IntegrityError as e:
+                    # Only this statement is rolled back; the rest of the batch still commits
+                    errors[username] = e
+            _bump_users_version(conn)
+
+@functools.lru_cache(maxsize=None)
+def _user_record_writer():
+    return UserRecordWriter()
+
+def save_user_record(username, user, create=False):
+    """
+    Durably inserts or replaces one user's record; the cost does not depend on member count.
+    Raises sqlite3.IntegrityError if the email belongs to another user, or if create=True
+    and the username already exists.
+    """
+    _user_record_writer().write(username, user, create)
+
+def _bump_users_version(conn):
+    """Marks the user directory as changed; must run inside the writing transaction."""
+    conn.execute("UPDATE meta SET value = value + 1 WHERE key = 'users_version'")
+
+def user_directory_version():
+    """Returns a counter that increases on every user directory write, from any process."""
+    with closing(connect_user_directory()) as conn:
+        row = conn.execute("SELECT value FROM meta WHERE key = 'users_version'").fetchone()
+    return int(row[0]) if row else 0
+
+def load_user_record(username):
+    """Returns one user's settings without parsing anyone else's, or None if unknown."""
+    with closing(connect_user_directory()) as conn:
+        row = conn.execute(
+            f"SELECT {', '.join(_USER_DIRECTORY_COLUMNS)} FROM users WHERE username = ?", (username,)
+        ).fetchone()
+    return _user_from_row(row) if row else None
+
+def is_username_taken(username):
+    with closing(connect_user_directory()) as conn:
+        return conn.execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone() is not None
+
+def is_email_taken(email):
+    with closing(connect_user_directory()) as conn:
+        return conn.execute("SELECT 1 FROM users WHERE email = ?", (email,)).fetchone() is not None
+
+def register_user(username, email, password):
+    save_user_record(username, {
+        "email": email,
+        "password": hash_password(password),
+        "preferred_movements": [],
+        "skill_level": 3,
+        "intensity": 3,
+        "variety": 3
+    }, create=True)
+
+def authenticate_user(email, password):
+    with closing(connect_user_directory()) as conn:
+        row = conn.execute("SELECT username, password FROM users WHERE email = ?", (email,)).fetchone()
+    if row is not None and verify_password(row[1], password):
+        return row[0]
+    return None
+
+STRENGTH_MOVEMENTS = ['Front Squat', 'Deadlift', 'Overhead Squat', 'Bench Press', 'Power Clean', 'Snatch']
+WARM_UP_ACTIVITIES = ['cardio', 'mobility drills', 'foam rolling']
+
+def generate_warm_up(theme, rng=random):
+    warm_up_options = [
+        f"10 minutes of dynamic stretching and light {rng.choice(WARM_UP_ACTIVITIES)} focusing on {theme.lower()}.",
+        f"5 minutes of jump rope followed by mobility drills targeting {theme.lower()}.",
+        f"10 minutes of foam rolling and light kettlebell swings to prepare for {theme.lower()}.",
+        f"10 minutes of dynamic stretching and activation exercises for {theme.lower()}."
+    ]
+    return rng.choice(warm_up_options)
+
+def generate_strength(theme, skill_level, intensity, rng=random):
+    # Adjust strength based on skill and intensity
+    strength_movement = rng.choice(STRENGTH_MOVEMENTS)
+    sets = rng.randint(3, 5) + (intensity // 2)
+    reps = rng.randint(3, 8) + (skill_level // 2)
+    strength_options = [
+        f"{sets} sets of {reps} {strength_movement} at {rng.randint(70, 85)}% 1RM.",
+        f"{sets} sets of {reps} {strength_movement} focusing on form and control.",
+        f"{sets} sets of {reps} {strength_movement} increasing weight each set.",
+        f"{sets} sets of {reps} {strength_movement} with short rest periods."
+    ]
+    return rng.choice(strength_options)
+
+class WodSpec:
+    """
+    Parsed form of a WOD line: format, duration (minutes) or rounds, and (reps, movement_id)
+    pairs. Lines that match none of the generated formats keep their original text in
+    `text` and render back to it unchanged.
+    """
+    __slots__ = ("format", "duration", "rounds", "parts", "text")
+
+    def __init__(self, format, parts=(), duration=None, rounds=None, text=None):
+        self.format = format
+        self.duration = duration
+        self.rounds = rounds
+        self.parts = tuple(parts)
+        self.text = text
+
+    def movements(self):
+        names = _WOD_SPECS["names"]
+        return [names[movement_id] for _, movement_id in self.parts]
+
+    @property
+    def scheme(self):
+        """The part of the display string before the first ':', or None."""
+        if self.format == "AMRAP" or self.format == "EMOM":
+            return f"{self.format} {self.duration} minutes"
+        if self.format == "For Time" or self.format == "Chipper":
+            return self.format
+        if self.format == "Rounds For Time":
+            return f"{self.rounds} Rounds For Time of"
+        if self.text and ":" in self.text:
+            return self.text.split(":", 1)[0].strip()
+        return None
+
+    def render(self):
+        if self.text is not None:
+            return self.text
+        names = _WOD_SPECS["names"]
+        items = [f"{reps} {names[movement_id]}" for reps, movement_id in self.parts]
+        if self.format == "AMRAP":
+            return f"AMRAP {self.duration} minutes: " + ", ".join(items)
+        if self.format == "EMOM":
+            return f"EMOM {self.duration} minutes: " + " + ".join(items)
+        if self.format == "For Time":
+            return f"For Time: {self.rounds} Rounds of " + ", ".join(items)
+        if self.format == "Chipper":
+            return "Chipper: " + ", ".join(items)
+        return f"{self.rounds} Rounds For Time of: " + ", ".join(items)
+
+@functools.lru_cache(maxsize=None)
+def _wod_spec_cache():
+    """
+    Process-wide parse cache ({WOD text: WodSpec}) and movement-id registry. Movement ids are
+    positions in "names": ALL_CROSSFIT_MOVEMENTS first, then movements interned on first sight.
+    """
+    names = list(dict.fromkeys(ALL_CROSSFIT_MOVEMENTS))
+    return {
+        "lock": threading.Lock(),
+        "specs": {},
+        "names": names,
+        "ids": {name: i for i, name in enumerate(names)}
+    }
+
+# Bound once at import; the cached factory hands back the same object every time
+_WOD_SPECS = _wod_spec_cache()
+WOD_SPEC_CACHE_SIZE = 200000
+
+def movement_id(name):
+    cache = _WOD_SPECS
+    movement = cache["ids"].get(name)
+    if movement is None:
+        with cache["lock"]:
+            movement = cache["ids"].get(name)
+            if movement is None:
+                movement = len(cache["names"])
+                cache["names"].append(name)
+                cache["ids"][name] = movement
+    return movement
+
+_WOD_LINE_PATTERNS = [
+    ("AMRAP", re.compile(r"^AMRAP (\d+) minutes: (.*)$"), ", "),
+    ("EMOM", re.compile(r"^EMOM (\d+) minutes: (.*)$"), " + "),
+    ("For Time", re.compile(r"^For Time: (\d+) Rounds of (.*)$"), ", "),
+    ("Chipper", re.compile(r"^Chipper: ()(.*)$"), ", "),
+    ("Rounds For Time", re.compile(r"^(\d+) Rounds For Time of: (.*)$"), ", "),
+]
+_WOD_ITEM_PATTERN = re.compile(r"^(\d+) (.+)$")
+
+def _parse_wod_items(items_text, separator):
+    parts = []
+    for item in items_text.split(separator):
+        match = _WOD_ITEM_PATTERN.match(item.strip())
+        if not match:
+            return None
+        parts.append((int(match.group(1)), movement_id(match.group(2))))
+    return parts
+
+def parse_wod_line(text):
+    """Parses a WOD display string into a WodSpec (see wod_spec() for the cached entry point)."""
+    for wod_format, pattern, separator in _WOD_LINE_PATTERNS:
+        match = pattern.match(text)
+        if match:
+            parts = _parse_wod_items(match.group(2), separator)
+            if parts is not None:
+                count = int(match.group(1)) if match.group(1) else None
+                if wod_format in ("AMRAP", "EMOM"):
+                    return WodSpec(wod_format, parts, duration=count)
+                return WodSpec(wod_format, parts, rounds=count)
+    # Standard/legacy text: keep it verbatim, extract "<reps> <movement>" items after ':' if possible
+    parts = _parse_wod_items(text.split(":", 1)[1], ",") if ":" in text else None
+    return WodSpec(None, parts or (), text=text)
+
+def remember_wod_spec(spec):
+    """Renders spec and caches it under its display string, so it is never parsed back."""
+    text = spec.render()
+    _cache_wod_spec(text, spec)
+    return text
+
+def _cache_wod_spec(text, spec):
+    """Adds text -> spec, evicting the oldest quarter of the cache (not all of it) when it is full."""
+    cache = _WOD_SPECS
+    with cache["lock"]:
+        specs = cache["specs"]
+        if len(specs) >= WOD_SPEC_CACHE_SIZE:
+            for old_text in list(itertools.islice(specs, WOD_SPEC_CACHE_SIZE // 4)):
+                del specs[old_text]
+        specs[text] = spec
+
+def wod_spec(wod):
+    """Returns the WodSpec for a WOD record (or WOD string), parsing each distinct string once per process."""
+    text = wod.get("WOD", "") if isinstance(wod, dict) else wod
+    cache = _WOD_SPECS
+    spec = cache["specs"].get(text)
+    if spec is None:
+        spec = parse_wod_line(text)
+        _cache_wod_spec(text, spec)
+    return spec
+
+def generate_wod(wod_format, movements, skill_level, intensity, rng=random):
+    try:
+        if wod_format == "AMRAP":
+            duration = rng.randint(10, 20) + intensity  # Higher intensity could mean longer duration
+            exercises = rng.sample(movements, min(4, len(movements)))
+            reps = [rng.randint(5, 15) + skill_level for _ in range(len(exercises))]
+            spec = WodSpec(wod_format, zip(reps, map(movement_id, exercises)), duration=duration)
+        elif wod_format == "EMOM":
+            duration = rng.randint(10, 20) + intensity
+            exercises = rng.sample(movements, min(3, len(movements)))
+            reps = [rng.randint(3, 10) + skill_level for _ in range(len(exercises))]
+            spec = WodSpec(wod_format, zip(reps, map(movement_id, exercises)), duration=duration)
+        elif wod_format == "For Time":
+            rounds = rng.randint(3, 5) + (intensity // 2)
+            exercises = rng.sample(movements, min(4, len(movements)))
+            reps = [rng.randint(5, 15) + skill_level for _ in range(len(exercises))]
+            spec = WodSpec(wod_format, zip(reps, map(movement_id, exercises)), rounds=rounds)
+        elif wod_format == "Chipper":
+            num_exercises = rng.randint(5, 7) + skill_level
+            num_exercises = min(num_exercises, len(movements))
+            exercises = rng.sample(movements, num_exercises)
+            reps = [rng.randint(10, 20) + intensity for _ in range(num_exercises)]
+            spec = WodSpec(wod_format, zip(reps, map(movement_id, exercises)))
+        elif wod_format == "Rounds For Time":
+            rounds = rng.randint(4, 6) + (intensity // 2)
+            exercises = rng.sample(movements, min(4, len(movements)))
+            reps = [rng.randint(5, 15) + skill_level for _ in range(len(exercises))]
+            spec = WodSpec(wod_format, zip(reps, map(movement_id, exercises)), rounds=rounds)
+        else:
+            return "Complete the workout as described."
+        return remember_wod_spec(spec)
+    except ValueError as e:
+        reporter.error(f"Error generating WOD: {e}")
+        return "Complete the workout as described."
+
+def get_wod_scheme(wod):
+    return wod_spec(wod).scheme
+
+def prompt_for_result(spec):
+    """Returns the result-entry prompt for a WodSpec; verbatim (standard/legacy) WODs are matched on their scheme text."""
+    if spec.format == "AMRAP":
+        return f"AMRAP {spec.duration} minutes: Enter total rounds/reps completed"
+    if spec.format == "For Time":
+        return "For Time: Enter finishing time (MM:SS)"
+    if spec.format == "EMOM":
+        return "EMOM: Enter total reps completed or time taken (MM:SS)"
+    if spec.format == "Chipper":
+        return "Chipper: Enter finishing time (MM:SS) or how far you got"
+    if spec.format == "Rounds For Time":
+        return "Rounds For Time: Enter completion time (MM:SS)"
+    scheme = spec.scheme
+    if scheme is None:
+        return "Enter your result (time MM:SS or reps):"
+    scheme_lower = scheme.lower()
+    if "amrap" in scheme_lower:
+        time_match = re.search(r"amrap\s*(\d+)", scheme_lower)
+        if time_match:
+            time = time_match.group(1)
+            return f"AMRAP {time} minutes: Enter total rounds/reps completed"
+        else:
+            return "AMRAP: Enter total rounds/reps completed"
+    elif "for time" in scheme_lower:
+        return "For Time: Enter finishing time (MM:SS)"
+    elif "emom" in scheme_lower:
+        return "EMOM: Enter total reps completed or time taken (MM:SS)"
+    elif "chipper" in scheme_lower:
+        return "Chipper: Enter finishing time (MM:SS) or how far you got"
+    elif "rounds for time" in scheme_lower:
+        return "Rounds For Time: Enter completion time (MM:SS)"
+    else:
+        return "Enter your result (time MM:SS or reps):"
+
+def parse_result_str(result_str):
+    if isinstance(result_str, str):
+        # Check time format MM:SS
+        time_pattern = re.compile(r"^(\d+):(\d+)$")
+        match = time_pattern.match(result_str)
+        if match:
+            minutes, seconds = int(match.group(1)), int(match.group(2))
+            return minutes * 60 + seconds
+        # Check if it's reps or rounds (e.g., "120 reps", "5 rounds")
+        words = result_str.lower().split()
+        for w in words:
+            if w.isdigit():
+                return int(w)
+    return np.nan
+
+def extract_movements_from_wod(wod):
+    """
+    Extracts movement names from the WOD string.
+    Example WOD: "AMRAP 13 minutes: 17 Atlas Stone Lifts, 10 Chest-to-Bar Pull-Up, 18 Assault Bike, 14 Tuck Jumps"
+    Returns: ['Atlas Stone Lifts', 'Chest-to-Bar Pull-Up', 'Assault Bike', 'Tuck Jumps']
+    """
+    return wod_spec(wod).movements()
+
+class MovementLoad:
+    """
+    Sliding window of the movements an athlete used over the last window_days days.
+    record() costs O(movements) (plus amortized expiry of days that left the window) and
+    weight() is O(1) per candidate, so day-by-day generation stays linear in the number of days.
+    Queries are relative to the latest recorded or queried date.
+    """
+
+    def __init__(self, window_days=14, rest_days=2):
+        self.window_days = window_days
+        self.rest_days = rest_days
+        self.head = None
+        self.days = {}
+        self.counts = {}
+        self.last_used = {}
+        self.version = None
+
+    def advance(self, ordinal):
+        """Moves the window end to ordinal, expiring days that fall out of it."""
+        if self.head is not None and ordinal <= self.head:
+            return
+        if self.head is not None:
+            if ordinal - self.head >= self.window_days:
+                expired = list(self.days)
+            else:
+                expired = range(self.head - self.window_days + 1, ordinal - self.window_days + 1)
+            for day in expired:
+                for movement in self.days.pop(day, ()):
+                    self.counts[movement] -= 1
+                    if not self.counts[movement]:
+                        del self.counts[movement]
+        self.head = ordinal
+
+    def record(self, date_str, movements):
+        """Adds one day's movements; days already outside the window only update last_used."""
+        ordinal = datetime.date.fromisoformat(date_str).toordinal()
+        self.advance(ordinal)
+        for movement in movements:
+            if self.last_used.get(movement, -1) < ordinal:
+                self.last_used[movement] = ordinal
+        if ordinal <= self.head - self.window_days:
+            return
+        self.days.setdefault(ordinal, []).extend(movements)
+        for movement in movements:
+            self.counts[movement] = self.counts.get(movement, 0) + 1
+
+    def weight(self, movement, ordinal):
+        """Sampling weight in (0, 1]: lower the more often and the more recently movement was used."""
+        weight = 1.0 / (1 + self.counts.get(movement, 0))
+        last = self.last_used.get(movement)
+        if last is not None and 0 <= ordinal - last <= self.rest_days:
+            weight *= 0.5
+        return weight
+
+    def weights(self, movements, date_str):
+        ordinal = datetime.date.fromisoformat(date_str).toordinal()
+        self.advance(ordinal)
+        return [self.weight(movement, ordinal) for movement in movements]
+
+    def weighted_sample(self, movements, k, date_str, rng=random):
+        """Weighted sampling without replacement (exponential clocks); draws one random per movement."""
+        weights = self.weights(movements, date_str)
+        keys = [-math.log(1.0 - rng.random()) / w for w in weights]
+        order = sorted(range(len(movements)), key=keys.__getitem__)
+        return [movements[i] for i in order[:k]]
+
+    def copy(self):
+        clone = MovementLoad(self.window_days, self.rest_days)
+        clone.head = self.head
+        clone.days = {day: list(movements) for day, movements in self.days.items()}
+        clone.counts = dict(self.counts)
+        clone.last_used = dict(self.last_used)
+        return clone
+
+@functools.lru_cache(maxsize=None)
+def _movement_load_cache():
+    """Process-wide {user: MovementLoad}, seeded from results and kept current by record_movement_load()."""
+    return {"lock": threading.Lock(), "loads": {}}
+
+def load_movement_load(user):
+    """
+    Returns the user's MovementLoad built from their recorded results. It is rebuilt only when
+    results were written by something other than record_movement_load(); callers that plan
+    ahead (calendar generation) should work on a copy().
+    """
+    cache = _movement_load_cache()
+    version = workout_results_version()
+    with cache["lock"]:
+        load = cache["loads"].get(user)
+        if load is not None and load.version == version:
+            count_metric("cache_hits", cache="movement_load")
+            return load
+    count_metric("cache_misses", cache="movement_load")
+    load = MovementLoad()
+    since = str(datetime.date.today() - datetime.timedelta(days=load.window_days))
+    for date_str, row in sorted(load_user_results_index(user).items()):
+        if since <= date_str[:10]:
+            load.record(date_str[:10], wod_spec(row).movements())
+    load.version = version
+    with cache["lock"]:
+        cache["loads"][user] = load
+    return load
+
+def record_movement_load(user, date_str, wod):
+    """Adds a saved result's movements to the cached MovementLoad in O(movements)."""
+    cache = _movement_load_cache()
+    with cache["lock"]:
+        load = cache["loads"].get(user)
+        if load is None:
+            return
+        version = workout_results_version()
+        if load.version != version - 1:
+            # Another writer got in between; rebuild from the results on next use
+            del cache["loads"][user]
+            return
+        load.record(date_str, wod_spec(wod).movements())
+        load.version = version
+
+def suggest_ai_wod(user, intensity, skill, variety, wod_database, user_preferences, rng=random, themes=None, movement_load=None, date_str=None):
+    """
+    Generates a highly varied and interesting AI-generated WOD based on user preferences and sliders.
+    Includes standard CrossFit workouts like "Cindy" periodically.
+    Pass a seeded random.Random as rng to make the result reproducible, and themes to skip
+    re-reading the global config. With a MovementLoad, movements the athlete used recently
+    around date_str (default today) are less likely to be picked.
+    """
+    if themes is None:
+        themes = load_global_config().get("themes", ["Full Body"])
+    theme = rng.choice(themes)
+    
+    warm_up = generate_warm_up(theme, rng)
+    
+    # Tailor strength based on skill and intensity
+    strength = generate_strength(theme, skill, intensity, rng)
+    
+    # Determine number of movements based on variety
+    num_movements = min(variety + 1, len(user_preferences))  # Ensuring at least variety +1 movements
+    
+    if num_movements <= 0:
+        return {
+            "Theme": theme,
+            "Warm-Up": warm_up,
+            "Strength": strength,
+            "WOD": "No WOD available. Please update your movement preferences.",
+            "Format": "N/A"
+        }
+    
+    # Select unique movements based on user preferences
+    if movement_load is None:
+        selected_movements = rng.sample(user_preferences, num_movements)
+    else:
+        selected_movements = movement_load.weighted_sample(
+            list(user_preferences), num_movements, date_str or str(datetime.date.today()), rng
+        )
+    
+    # Choose WOD format based on skill level
+    if skill >= 4:
+        wod_format = "For Time"
+        rounds = rng.randint(3, 5) + (intensity // 2)
+        parts = [(rng.randint(5, 15) + skill, movement_id(ex)) for ex in selected_movements]
+        wod = remember_wod_spec(WodSpec(wod_format, parts, rounds=rounds))
+    elif skill >= 2:
+        wod_format = "Rounds For Time"
+        rounds = rng.randint(4, 6) + (intensity // 2)
+        parts = [(rng.randint(5, 15) + skill, movement_id(ex)) for ex in selected_movements]
+        wod = remember_wod_spec(WodSpec(wod_format, parts, rounds=rounds))
+    else:
+        wod_format = "AMRAP"
+        duration = rng.randint(12, 20) + intensity
+        parts = [(rng.randint(5, 15) + skill, movement_id(ex)) for ex in selected_movements]
+        wod = remember_wod_spec(WodSpec(wod_format, parts, duration=duration))
+    
+    # Occasionally include standard CrossFit WODs like "Cindy"
+    if rng.random() < 0.1:  # 10% chance
+        standard_wods = find_wods_by_theme(wod_database, ["Cindy"])
+        if standard_wods:
+            standard_wod = rng.choice(standard_wods)
+            wod = standard_wod['WOD']
+            theme = standard_wod['Theme']
+    
+    return {
+        "Theme": theme,
+        "Warm-Up": warm_up,
+        "Strength": strength,
+        "WOD": wod,
+        "Format": wod_format
+    }
+
+@timed("generate_wod_calendar_batch")
+def generate_wod_calendar_batch(start_date, total_days, user_record, wod_database, themes, seed=None, movement_load=None,
+                                dates=None, kept_days=None, excluded_movements=None):
+    """
+    Bulk equivalent of calling suggest_ai_wod() once per day: every theme, format parameter,
+    rep count and movement sample for total_days is drawn in batched NumPy operations, and
+    only the final string formatting runs per day.
+    With a MovementLoad, each day's movements are weighted by the load of the days before it
+    and recorded into it, so pass a copy() of a shared tracker.
+    dates (ascending date strings) replaces the total_days consecutive days from start_date;
+    kept_days ({date_str: wod} not being regenerated) are recorded into the MovementLoad in
+    date order, so scattered regenerated days are weighted against their neighbours.
+    Standard WODs using any of excluded_movements are never picked.
+    Returns {date_str: {"Theme", "Warm-Up", "Strength", "WOD", "Format"}}.
+    """
+    rng = np.random.default_rng(seed)
+    if dates is None:
+        dates = [str(start_date + datetime.timedelta(days=i)) for i in range(total_days)]
+    n = len(dates)
+    user_preferences = list(user_record.get("preferred_movements", []))
+    skill = user_record.get("skill_level", 3)
+    intensity = user_record.get("intensity", 3)
+    variety = user_record.get("variety", 3)
+    themes = themes or ["Full Body"]
+    kept = collections.deque(sorted(kept_days.items())) if kept_days and movement_load is not None else collections.deque()
+
+    theme_idx = rng.integers(0, len(themes), size=n)
+
+    # Warm-up: template variant, plus the activity used by the first template
+    warm_up_variant = rng.integers(0, 4, size=n)
+    warm_up_activity = rng.integers(0, len(WARM_UP_ACTIVITIES), size=n)
+
+    # Strength: movement, sets, reps, %1RM and template variant
+    strength_movement = rng.integers(0, len(STRENGTH_MOVEMENTS), size=n)
+    strength_sets = rng.integers(3, 6, size=n) + (intensity // 2)
+    strength_reps = rng.integers(3, 9, size=n) + (skill // 2)
+    strength_pct = rng.integers(70, 86, size=n)
+    strength_variant = rng.integers(0, 4, size=n)
+
+    num_movements = min(variety + 1, len(user_preferences))
+    if num_movements > 0:
+        # Sampling without replacement for every day at once: rank a random key per preference
+        keys = rng.random((n, len(user_preferences)))
+        if movement_load is None:
+            picks = np.argsort(keys, axis=1)[:, :num_movements]
+        else:
+            # Exponential clocks -log(1 - u) / w keep the unweighted order when every w is 1
+            clocks = -np.log1p(-keys)
+        reps = rng.integers(5, 16, size=(n, num_movements)) + skill
+        if skill >= 4:
+            wod_format = "For Time"
+            counts = rng.integers(3, 6, size=n) + (intensity // 2)
+        elif skill >= 2:
+            wod_format = "Rounds For Time"
+            counts = rng.integers(4, 7, size=n) + (intensity // 2)
+        else:
+            wod_format = "AMRAP"
+            counts = rng.integers(12, 21, size=n) + intensity
+    standard_wods = find_wods_by_theme(wod_database, ["Cindy"])
+    if excluded_movements:
+        standard_wods = [wod for wod in standard_wods if excluded_movements.isdisjoint(wod_spec(wod).movements())]
+    use_standard = rng.random(n) < 0.1
+    standard_idx = rng.integers(0, max(len(standard_wods), 1), size=n)
+
+    calendar = {}
+    for i, date_str in enumerate(dates):
+        while kept and kept[0][0] < date_str:
+            kept_date, kept_wod = kept.popleft()
+            movement_load.record(kept_date, wod_spec(kept_wod).movements())
+        theme = themes[theme_idx[i]]
+        theme_lower = theme.lower()
+        variant = warm_up_variant[i]
+        if variant == 0:
+            warm_up = f"10 minutes of dynamic stretching and light {WARM_UP_ACTIVITIES[warm_up_activity[i]]} focusing on {theme_lower}."
+        elif variant == 1:
+            warm_up = f"5 minutes of jump rope followed by mobility drills targeting {theme_lower}."
+        elif variant == 2:
+            warm_up = f"10 minutes of foam rolling and light kettlebell swings to prepare for {theme_lower}."
+        else:
+            warm_up = f"10 minutes of dynamic stretching and activation exercises for {theme_lower}."
+
+        prefix = f"{strength_sets[i]} sets of {strength_reps[i]} {STRENGTH_MOVEMENTS[strength_movement[i]]}"
+        variant = strength_variant[i]
+        if variant == 0:
+            strength = f"{prefix} at {strength_pct[i]}% 1RM."
+        elif variant == 1:
+            strength = f"{prefix} focusing on form and control."
+        elif variant == 2:
+            strength = f"{prefix} increasing weight each set."
+        else:
+            strength = f"{prefix} with short rest periods."
+
+        if num_movements <= 0:
+            calendar[date_str] = {
+                "Theme": theme,
+                "Warm-Up": warm_up,
+                "Strength": strength,
+                "WOD": "No WOD available. Please update your movement preferences.",
+                "Format": "N/A"
+            }
+            continue
+
+        if movement_load is None:
+            day_picks = picks[i].tolist()
+        else:
+            weights = np.array(movement_load.weights(user_preferences, date_str))
+            day_picks = np.argsort(clocks[i] / weights)[:num_movements].tolist()
+        parts = ", ".join([f"{rep} {user_preferences[j]}" for rep, j in zip(reps[i].tolist(), day_picks)])
+        if wod_format == "For Time":
+            wod = f"For Time: {counts[i]} Rounds of {parts}"
+        elif wod_format == "Rounds For Time":
+            wod = f"{counts[i]} Rounds For Time of: {parts}"
+        else:
+            wod = f"AMRAP {counts[i]} minutes: {parts}"
+
+        if use_standard[i] and standard_wods:
+            standard_wod = standard_wods[standard_idx[i]]
+            wod = standard_wod['WOD']
+            theme = standard_wod['Theme']
+            if movement_load is not None:
+                movement_load.record(date_str, wod_spec(standard_wod).movements())
+        elif movement_load is not None:
+            movement_load.record(date_str, [user_preferences[j] for j in day_picks])
+
+        calendar[date_str] = {
+            "Theme": theme,
+            "Warm-Up": warm_up,
+            "Strength": strength,
+            "WOD": wod,
+            "Format": wod_format
+        }
+    for kept_date, kept_wod in kept:
+        movement_load.record(kept_date, wod_spec(kept_wod).movements())
+    return calendar
+
+def _wod_fingerprint(wod):
+    """Stable 64-bit hash of the WOD text, used to spot entries whose movements may have changed."""
+    return int.from_bytes(hashlib.blake2b(wod.get("WOD", "").encode(), digest_size=8).digest(), "little")
+
+MOVEMENT_INDEX_VERSION = 2  # Bump when extract_movements_from_wod() changes meaning
+
+class MovementIndex:
+    """
+    Movement -> WOD inverted index over the WOD database.
+    Each WOD's movement set is a row of uint64 bit words (one bit per vocabulary movement),
+    so "every movement is in my preferences" is a vectorized subset test over all rows.
+    The vocabulary is ALL_CROSSFIT_MOVEMENTS followed by any other movement the database uses.
+    """
+
+    def __init__(self, vocabulary, masks, fingerprints, signature=None):
+        self.vocabulary = list(vocabulary)
+        self.positions = {movement: i for i, movement in enumerate(self.vocabulary)}
+        self.masks = masks
+        self.fingerprints = fingerprints
+        self.signature = signature
+        # CSR postings: WOD ids using movement i are ids[indptr[i]:indptr[i + 1]]
+        bits = np.unpackbits(masks.view(np.uint8), axis=1, bitorder="little")[:, :len(self.vocabulary)]
+        movement_ids, wod_ids = np.nonzero(bits.T)
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(movement_ids, minlength=len(self.vocabulary)))])
+        self.ids = wod_ids
+
+    @staticmethod
+    def _words(vocabulary_size):
+        return max(1, (vocabulary_size + 63) // 64)
+
+    @classmethod
+    def build(cls, database, previous=None, signature=None):
+        """
+        Indexes database. With a previous index, only entries that are new or whose WOD text
+        changed are re-parsed; everything else is copied over.
+        """
+        fingerprints = np.fromiter((_wod_fingerprint(wod) for wod in database), dtype=np.uint64, count=len(database))
+        vocabulary = list(previous.vocabulary) if previous is not None else list(dict.fromkeys(ALL_CROSSFIT_MOVEMENTS))
+        positions = {movement: i for i, movement in enumerate(vocabulary)}
+
+        if previous is not None:
+            reusable = min(len(previous.fingerprints), len(database))
+            unchanged = np.zeros(len(database), dtype=bool)
+            unchanged[:reusable] = previous.fingerprints[:reusable] == fingerprints[:reusable]
+        else:
+            unchanged = np.zeros(len(database), dtype=bool)
+
+        changed_rows = {}
+        for i in np.flatnonzero(~unchanged):
+            bit_positions = []
+            for movement in extract_movements_from_wod(database[i]):
+                if movement not in positions:
+                    positions[movement] = len(vocabulary)
+                    vocabulary.append(movement)
+                bit_positions.append(positions[movement])
+            changed_rows[i] = bit_positions
+
+        masks = np.zeros((len(database), cls._words(len(vocabulary))), dtype=np.uint64)
+        if previous is not None:
+            reused = np.flatnonzero(unchanged)
+            masks[reused, :previous.masks.shape[1]] = previous.masks[reused]
+        for i, bit_positions in changed_rows.items():
+            for bit in bit_positions:
+                masks[i, bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return cls(vocabulary, masks, fingerprints, signature)
+
+    def preference_mask(self, user_preferences):
+        mask = np.zeros(self.masks.shape[1], dtype=np.uint64)
+        for movement in user_preferences:
+            bit = self.positions.get(movement)
+            if bit is not None:
+                mask[bit // 64] |= np.uint64(1) << np.uint64(bit % 64)
+        return mask
+
+    def matching_ids(self, user_preferences):
+        """Ids of WODs whose movements are all within user_preferences."""
+        outside = ~self.preference_mask(user_preferences)
+        return np.flatnonzero(((self.masks & outside) == 0).all(axis=1))
+
+    def postings(self, movement):
+        """Ids of WODs that use movement."""
+        i = self.positions.get(movement)
+        if i is None:
+            return np.empty(0, dtype=np.int64)
+        return self.ids[self.indptr[i]:self.indptr[i + 1]]
+
+    def save(self, filename):
+        tmp_path = f"{filename}.{os.getpid()}.tmp.npz"
+        np.savez(
+            tmp_path,
+            vocabulary=np.array(self.vocabulary, dtype=str),
+            masks=self.masks,
+            fingerprints=self.fingerprints,
+            signature=np.array(self.signature if self.signature else (0, 0), dtype=np.int64),
+            version=np.array(MOVEMENT_INDEX_VERSION)
+        )
+        os.replace(tmp_path, filename)
+
+    @classmethod
+    def load(cls, filename):
+        with np.load(filename) as data:
+            if "version" not in data or int(data["version"]) != MOVEMENT_INDEX_VERSION:
+                raise ValueError(f"{filename} was built by an older index format")
+            signature = tuple(int(x) for x in data["signature"])
+            return cls(data["vocabulary"].tolist(), data["masks"], data["fingerprints"], signature)
+
+@functools.lru_cache(maxsize=None)
+def _movement_index_cache():
+    return {"lock": threading.Lock(), "index": None}
+
+def load_movement_index():
+    """
+    Returns the MovementIndex for the current WOD database. It is kept in memory per process,
+    persisted to WOD_INDEX_FILE, and updated incrementally when the database file changes.
+    """
+    cache = _movement_index_cache()
+    with cache["lock"]:
+        signature = file_signature(WOD_DATABASE_FILE)
+        index = cache["index"]
+        if index is not None and index.signature == signature:
+            count_metric("cache_hits", cache="movement_index")
+            return index
+        count_metric("cache_misses", cache="movement_index")
+        if index is None and os.path.exists(WOD_INDEX_FILE):
+            try:
+                index = MovementIndex.load(WOD_INDEX_FILE)
+            except (OSError, ValueError, KeyError):
+                index = None
+        if index is None or index.signature != signature:
+            index = MovementIndex.build(load_wod_database(), previous=index, signature=signature)
+            try:
+                index.save(WOD_INDEX_FILE)
+            except OSError as e:
+                reporter.warning(f"Could not save {WOD_INDEX_FILE}: {e}")
+        cache["index"] = index
+        return index
+
+def get_calendar_mode():
+    """
+    Returns "stored" (pre-generated calendar kept in WOD_CALENDAR_DB_FILE) or
+    "generated" (each user's WOD for a date is derived on demand from a stable seed).
+    """
+    return load_global_config().get("calendar_mode", "stored")
+
+def preferences_hash(user_preferences, skill, intensity, variety):
+    payload = json.dumps([sorted(user_preferences), skill, intensity, variety])
+    return hashlib.sha256(payload.encode()).hexdigest()[:16]
+
+def wod_seed(user, date_str, pref_hash):
+    """Stable 64-bit seed for (user, date, preferences); independent of PYTHONHASHSEED."""
+    digest = hashlib.sha256(f"{user}|{date_str}|{pref_hash}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+@timed("generate_wod_for_date")
+def generate_wod_for_date(user, date_str, user_record, wod_database, themes=None):
+    """
+    Computes the user's WOD for date_str deterministically: the same user, date and
+    preferences always give the same WOD, so nothing has to be stored.
+    Pass themes when rendering several dates to read the global config only once.
+    """
+    user_preferences = sorted(user_record.get("preferred_movements", []))
+    skill = user_record.get("skill_level", 3)
+    intensity = user_record.get("intensity", 3)
+    variety = user_record.get("variety", 3)
+    pref_hash = preferences_hash(user_preferences, skill, intensity, variety)
+    return suggest_ai_wod(
+        user=user,
+        intensity=intensity,
+        skill=skill,
+        variety=variety,
+        wod_database=wod_database,
+        user_preferences=user_preferences,
+        rng=random.Random(wod_seed(user, date_str, pref_hash)),
+        themes=themes
+    )
+
+@timed("get_calendar_window")
+def get_calendar_window(user, start_date, days, user_record, wod_database, mode=None, persist=True):
+    """
+    Returns [(date, wod or None)] for days consecutive dates from start_date, reading the stored
+    calendar (or overrides) for just that range, so any window of the decade costs the same.
+    Stored-mode gaps from today on are filled from the stable per-date seed of
+    generate_wod_for_date() and saved in one transaction; earlier gaps stay None. With
+    persist=False (read-only callers such as the API) the same WODs are returned unsaved, so a
+    read shows exactly what the app will store for that date.
+    """
+    global_config = load_global_config()
+    mode = mode or global_config.get("calendar_mode", "stored")
+    themes = global_config.get("themes", ["Full Body"])
+    dates = [start_date + datetime.timedelta(days=i) for i in range(days)]
+    first, last = str(dates[0]), str(dates[-1])
+    if mode == "generated":
+        overrides = load_wod_overrides_range(user, first, last)
+        return [
+            (date, overrides.get(str(date)) or generate_wod_for_date(user, str(date), user_record, wod_database, themes))
+            for date in dates
+        ]
+    stored = load_wod_calendar_range(first, last, user)
+    today = datetime.date.today()
+    filled = {}
+    window = []
+    for date in dates:
+        date_str = str(date)
+        wod = stored.get(date_str)
+        if wod is None and date >= today and wod_database:
+            wod = generate_wod_for_date(user, date_str, user_record, wod_database, themes)
+            if persist:
+                filled[date_str] = wod
+        window.append((date, wod))
+    if filled:
+        save_wod_calendar_days(filled, user)
+    return window
+
+def calendar_window_bounds(view, anchor):
+    """(first date, number of days) shown by a calendar view ("Week", "Month" or "30 Days") around anchor."""
+    if view == "Week":
+        return anchor - datetime.timedelta(days=anchor.weekday()), 7
+    if view == "Month":
+        first = anchor.replace(day=1)
+        next_month = (first + datetime.timedelta(days=32)).replace(day=1)
+        return first, (next_month - first).days
+    return anchor, 30
+
+def shift_calendar_anchor(view, anchor, steps):
+    """Moves anchor by steps whole views (weeks, months or 30-day pages)."""
+    if view == "Week":
+        return anchor + datetime.timedelta(days=7 * steps)
+    if view == "Month":
+        month = anchor.year * 12 + anchor.month - 1 + steps
+        return datetime.date(month // 12, month % 12 + 1, 1)
+    return anchor + datetime.timedelta(days=30 * steps)
+
+_MERSENNE_PRIME = (1 << 31) - 1
+_REP_TOKEN_OFFSET = 1 << 17
+
+class WodDeduplicator:
+    """
+    Streaming exact and near-duplicate filter for catalog entries, linear in the number of entries.
+    Exact duplicates share a canonical key: format, duration/rounds and the sorted (movement, reps)
+    pairs. Near duplicates are found with MinHash over movement and bucketed rep-scheme tokens and
+    LSH banding within each format; band collisions are confirmed with the exact Jaccard
+    similarity against at most max_candidates earlier entries.
+    """
+
+    def __init__(self, threshold=0.8, num_perm=64, bands=8, seed=1, max_candidates=16):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, _MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+        self.b = rng.integers(0, _MERSENNE_PRIME, size=num_perm, dtype=np.int64)
+        self.bands = bands
+        self.rows = num_perm // bands
+        self.threshold = threshold
+        self.max_candidates = max_candidates
+        self.exact_keys = set()
+        self.buckets = {}
+        self.kept_tokens = []
+        self.stats = {"seen": 0, "exact_duplicates": 0, "near_duplicates": 0}
+
+    def keep_mask(self, formats, counts, n_parts, reps, movements, texts):
+        """
+        Takes one chunk as columns (format codes with 0 = unparsed, counts, part counts and
+        (n, k) reps/movement id matrices, plus the raw text for unparsed rows) and returns a
+        boolean mask of the rows to keep. Rows are also compared with every earlier chunk.
+        """
+        n, k = movements.shape
+        valid = np.arange(k)[None, :] < n_parts[:, None]
+        pairs = np.where(valid, movements.astype(np.int64) * 65536 + reps, -1)
+        pairs.sort(axis=1)
+        # Tokens: one per movement plus one per (movement, rep bucket); padding hashes to the max
+        tokens = np.concatenate([movements, _REP_TOKEN_OFFSET + movements.astype(np.int64) * 8 + np.minimum(reps // 4, 7)], axis=1)
+        token_valid = np.concatenate([valid, valid], axis=1)
+        hashed = (self.a[:, None, None] * tokens[None, :, :] + self.b[:, None, None]) % _MERSENNE_PRIME
+        signatures = np.where(token_valid[None, :, :], hashed, _MERSENNE_PRIME).min(axis=2).T
+
+        keep = np.zeros(n, dtype=bool)
+        for i in range(n):
+            self.stats["seen"] += 1
+            if formats[i] == 0:
+                exact_key = ("text", texts[i])
+            else:
+                exact_key = (int(formats[i]), int(counts[i]), pairs[i].tobytes())
+            if exact_key in self.exact_keys:
+                self.stats["exact_duplicates"] += 1
+                continue
+            self.exact_keys.add(exact_key)
+            if formats[i] == 0 or n_parts[i] == 0:
+                keep[i] = True
+                continue
+
+            token_set = frozenset(tokens[i][token_valid[i]].tolist())
+            band_keys = [
+                (int(formats[i]), band, signatures[i, band * self.rows:(band + 1) * self.rows].tobytes())
+                for band in range(self.bands)
+            ]
+            checked = set()
+            duplicate = False
+            for band_key in band_keys:
+                for j in self.buckets.get(band_key, ()):
+                    if j in checked:
+                        continue
+                    checked.add(j)
+                    other = self.kept_tokens[j]
+                    if len(token_set & other) >= self.threshold * len(token_set | other):
+                        duplicate = True
+                        break
+                if duplicate or len(checked) >= self.max_candidates:
+                    break
+            if duplicate:
+                self.stats["near_duplicates"] += 1
+                continue
+            keep[i] = True
+            position = len(self.kept_tokens)
+            self.kept_tokens.append(token_set)
+            for band_key in band_keys:
+                bucket = self.buckets.setdefault(band_key, [])
+                if len(bucket) < self.max_candidates:
+                    bucket.append(position)
+        return keep
+
+def _record_columns(records):
+    """Column form of dict records for WodDeduplicator.keep_mask(), via the shared WodSpec parse."""
+    n = len(records)
+    formats = np.zeros(n, dtype=np.int64)
+    counts = np.zeros(n, dtype=np.int64)
+    n_parts = np.zeros(n, dtype=np.int64)
+    reps = np.zeros((n, MAX_CATALOG_PARTS), dtype=np.int64)
+    movements = np.zeros((n, MAX_CATALOG_PARTS), dtype=np.int64)
+    texts = [None] * n
+    for i, record in enumerate(records):
+        spec = wod_spec(record)
+        if spec.format is None or len(spec.parts) > MAX_CATALOG_PARTS:
+            texts[i] = record.get("WOD", "")
+            continue
+        formats[i] = _CATALOG_WOD_FORMATS.index(spec.format)
+        counts[i] = spec.duration if spec.duration is not None else (spec.rounds or 0)
+        n_parts[i] = len(spec.parts)
+        for j, (rep, movement) in enumerate(spec.parts):
+            reps[i, j] = rep
+            movements[i, j] = movement
+    return formats, counts, n_parts, reps, movements, texts
+
+def _catalog_columns(catalog, start, stop):
+    """Column form of catalog rows start:stop, read straight from the memory map."""
+    rows = catalog.records[start:stop]
+    verbatim = (rows["flags"] & CATALOG_FLAG_VERBATIM) != 0
+    formats = np.where(verbatim, 0, rows["wod_format"]).astype(np.int64)
+    texts = [catalog.texts[t] if f == 0 else None for f, t in zip(formats.tolist(), rows["text"].tolist())]
+    n_parts = np.where(formats == 0, 0, rows["n_parts"]).astype(np.int64)
+    return formats, rows["count"].astype(np.int64), n_parts, rows["reps"].astype(np.int64), rows["movements"].astype(np.int64), texts
+
+def dedupe_wod_records(records, deduplicator=None, chunk_size=4096):
+    """Yields the records that are neither exact nor near duplicates of an earlier record."""
+    deduplicator = deduplicator or WodDeduplicator()
+    records = iter(records)
+    while True:
+        chunk = list(itertools.islice(records, chunk_size))
+        if not chunk:
+            return
+        keep = deduplicator.keep_mask(*_record_columns(chunk))
+        yield from (record for record, kept in zip(chunk, keep) if kept)
+
+def find_unique_wods(database, deduplicator=None, chunk_size=4096):
+    """Returns the indices of database entries that survive deduplication, in order."""
+    deduplicator = deduplicator or WodDeduplicator()
+    kept = []
+    for start in range(0, len(database), chunk_size):
+        stop = min(start + chunk_size, len(database))
+        if isinstance(database, list):
+            columns = _record_columns(database[start:stop])
+        else:
+            columns = _catalog_columns(database, start, stop)
+        kept.append(start + np.flatnonzero(deduplicator.keep_mask(*columns)))
+    return np.concatenate(kept) if kept else np.zeros(0, dtype=np.int64)
+
+def dedupe_wod_database(threshold=0.8):
+    """Removes duplicate and near-duplicate entries from the stored WOD database; returns the stats."""
+    database = load_wod_database()
+    deduplicator = WodDeduplicator(threshold=threshold)
+    kept = find_unique_wods(database, deduplicator)
+    if len(kept) < len(database):
+        write_json_array((database[i] for i in kept), WOD_DATABASE_FILE)
+        convert_json_to_catalog(WOD_DATABASE_FILE, WOD_CATALOG_FILE)
+    return deduplicator.stats
+
+WOD_FORMATS = ["AMRAP", "EMOM", "For Time", "Chipper", "Rounds For Time"]
+WOD_SHARD_SIZE = 2000  # Fixed shard size keeps output independent of the worker count
+
+def shard_seed(seed, theme, shard_index):
+    digest = hashlib.sha256(f"{seed}|{theme}|{shard_index}".encode()).digest()
+    return int.from_bytes(digest[:8], "big")
+
+def generate_wod_shard(theme, shard_index, count, seed, skill_level=3, intensity=3):
+    """Generates one shard of catalog entries from its own seeded RNG."""
+    rng = random.Random(shard_seed(seed, theme, shard_index))
+    records = []
+    for _ in range(count):
+        wod_format = rng.choice(WOD_FORMATS)
+        records.append({
+            "Theme": theme,
+            "Warm-Up": generate_warm_up(theme, rng),
+            "Strength": generate_strength(theme, skill_level, intensity, rng),
+            "WOD": generate_wod(wod_format, ALL_CROSSFIT_MOVEMENTS, skill_level, intensity, rng),
+            "Format": wod_format
+        })
+    return records
+
+def _wod_shard_worker(tasks, results):
+    # Forked while other threads may hold the parse-cache lock; give this process its own
+    _WOD_SPECS["lock"] = threading.Lock()
+    for position, args in iter(tasks.get, None):
+        results.put((position, generate_wod_shard(*args)))
+
+def generate_wod_database(themes, per_theme, seed=None, workers=None, skill_level=3, intensity=3, progress=None):
+    """
+    Yields catalog entries for every theme, per_theme each, in a fixed order.
+    The theme x count space is split into WOD_SHARD_SIZE shards with seeds derived from
+    (seed, theme, shard), and shards run on a pool of forked worker processes. Output for a
+    given seed is identical for any worker count. At most 2 x workers shards are held in memory.
+    progress(done, total) is called as entries are produced.
+    """
+    if seed is None:
+        seed = random.getrandbits(64)
+    shards = []
+    for theme in themes:
+        for shard_index, start in enumerate(range(0, per_theme, WOD_SHARD_SIZE)):
+            shards.append((theme, shard_index, min(WOD_SHARD_SIZE, per_theme - start), seed, skill_level, intensity))
+    total = len(themes) * per_theme
+    done = 0
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or len(shards) <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for args in shards:
+            records = generate_wod_shard(*args)
+            done += len(records)
+            yield from records
+            if progress:
+                progress(done, total)
+        return
+
+    context = multiprocessing.get_context("fork")
+    tasks, results = context.Queue(), context.Queue()
+    processes = [context.Process(target=_wod_shard_worker, args=(tasks, results), daemon=True) for _ in range(min(workers, len(shards)))]
+    for process in processes:
+        process.start()
+    try:
+        submitted = 0
+        for _ in range(min(2 * len(processes), len(shards))):
+            tasks.put((submitted, shards[submitted]))
+            submitted += 1
+        buffered = {}
+        for position in range(len(shards)):
+            while position not in buffered:
+                finished, records = results.get()
+                buffered[finished] = records
+                if submitted < len(shards):
+                    tasks.put((submitted, shards[submitted]))
+                    submitted += 1
+            records = buffered.pop(position)
+            done += len(records)
+            yield from records
+            if progress:
+                progress(done, total)
+    finally:
+        for _ in processes:
+            tasks.put(None)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+@timed("initialize_wod_database")
+def initialize_wod_database(per_theme=500, seed=None, workers=None, dedupe=True):
+    """
+    Generates a diverse WOD database with 10 years' worth of workouts.
+    Each WOD has a unique combination of themes, movements, and formats.
+    Includes standard CrossFit workouts like "Cindy".
+    Entries are streamed to WOD_DATABASE_FILE and the binary catalog as they are generated,
+    dropping exact and near duplicates unless dedupe=False.
+    """
+    if not os.path.exists(WOD_DATABASE_FILE):
+        reporter.info("Generating WOD Database. This may take a moment...")
+        global_config = load_global_config()
+        themes = global_config.get("themes", ["Full Body"])
+
+        # Include standard WODs
+        standard_wods = [{
+            "Theme": wod["Theme"],
+            "Warm-Up": wod["Warm-Up"],
+            "Strength": wod["Strength"],
+            "WOD": wod["WOD"],
+            "Format": "Standard"
+        } for wod in global_config.get("recommended_wods", {}).values()]
+
+        progress_bar = reporter.progress(0)
+        generated = generate_wod_database(
+            themes, per_theme, seed=seed, workers=workers,
+            progress=lambda done, total: progress_bar.progress(done / total)
+        )
+        records = itertools.chain(standard_wods, generated)
+        if dedupe:
+            records = dedupe_wod_records(records)
+        count = write_json_array(records, WOD_DATABASE_FILE)
+        convert_json_to_catalog(WOD_DATABASE_FILE, WOD_CATALOG_FILE)
+        database = load_wod_database()
+        if count:
+            reporter.success("WOD Database generated successfully!")
+        else:
+            reporter.error("Failed to generate WOD Database.")
+    else:
+        database = load_wod_database()
+        if not database:
+            reporter.error("WOD Database file exists but is empty. Regenerating...")
+            os.remove(WOD_DATABASE_FILE)
+            initialize_wod_database(per_theme, seed, workers, dedupe)
+            database = load_wod_database()
+    return database
+
+def generate_user_calendar(user, user_record, wod_database, themes, total_days=3650, start_date=None):
+    """
+    Builds the user's calendar for total_days from start_date (default today) with their
+    sliders and preferences, down-weighting movements from their recent results.
+    Returns {date_str: wod}.
+    """
+    movement_load = load_movement_load(user).copy()
+    return generate_wod_calendar_batch(
+        start_date or datetime.date.today(), total_days, user_record, wod_database, themes, movement_load=movement_load
+    )
+
+@timed("initialize_wod_calendar")
+def initialize_wod_calendar(user, user_preferences, flush=False):
+    """
+    Generates or regenerates the user's WOD Calendar based on user preferences.
+    If flush=True, the user's calendar from today on is replaced.
+    Assigns AI-generated WODs to each date based on user preferences.
+    In "generated" calendar mode nothing is pre-built; flush only drops future overrides.
+    """
+    if get_calendar_mode() == "generated":
+        if flush:
+            clear_wod_overrides(user, str(datetime.date.today()))
+        return {}
+    if flush or is_wod_calendar_empty(user):
+        reporter.info("Generating WOD Calendar. This may take a moment...")
+        calendar = {}
+        database = load_wod_database()
+        if not database:
+            reporter.error("WOD Database is empty. Please regenerate the WOD Database first.")
+            return calendar
+        
+        # Filter WODs based on user preferences
+        matching_ids = load_movement_index().matching_ids(user_preferences)
+        
+        if len(matching_ids) == 0:
+            reporter.error("No WODs match your preferred movements. Please adjust your preferences.")
+            return calendar
+        
+        # Read the user's sliders once for the whole batch
+        user_record = dict(load_user_record(user))
+        user_record["preferred_movements"] = user_preferences
+        themes = load_global_config().get("themes", ["Full Body"])
+        calendar = generate_user_calendar(user, user_record, database, themes)
+        try:
+            save_user_wod_calendar(user, calendar)
+        except sqlite3.Error as e:
+            reporter.error(f"Could not save WOD calendar: {e}")
+            return {}
+        reporter.success("WOD Calendar generated successfully!")
+    else:
+        calendar = load_wod_calendar(user)
+    return calendar
+
+def regenerate_user_calendar(user, user_record, total_days=3650, start_date=None):
+    """
+    Non-interactive flush-and-regenerate of one user's calendar: queues the same "calendar"
+    job as submit_calendar_job() and runs it in the calling thread with run_job(), so it
+    never interleaves with another job for the user. Returns (days written, seconds) and
+    raises RuntimeError if the job failed; stored mode only, since generated mode has
+    nothing to build.
+    """
+    started = time.perf_counter()
+    params = {
+        "start": str(start_date or datetime.date.today()),
+        **{name: user_record.get(name, default) for name, default in (
+            ("preferred_movements", []), ("skill_level", 3), ("intensity", 3), ("variety", 3)
+        )},
+    }
+    with span("regenerate_user_calendar"):
+        job = run_job(submit_job(user, "calendar", params, total_days, run=False))
+    if job["status"] != "done":
+        raise RuntimeError(job["error"] or f"Job {job['id']} {job['status']}")
+    return job["done"], time.perf_counter() - started
+
+def _calendar_worker(tasks, results, total_days, start_date):
+    _WOD_SPECS["lock"] = threading.Lock()
+    for user, user_record in iter(tasks.get, None):
+        try:
+            days, seconds = regenerate_user_calendar(user, user_record, total_days, start_date)
+            results.put((user, days, seconds, None))
+        except Exception as e:
+            results.put((user, 0, 0.0, f"{type(e).__name__}: {e}"))
+
+def regenerate_calendars(users, workers=None, total_days=3650, start_date=None):
+    """
+    Regenerates calendars for users ({username: record}) on a pool of forked worker processes
+    and yields (user, days, seconds, error) as each finishes. Each worker holds one calendar
+    at a time and at most 2 x workers users are queued, so memory does not grow with the
+    number of users. Workers share the memory-mapped catalog; SQLite serialises their writes.
+    Each user's calendar is written by a job (see regenerate_user_calendar()), so it waits
+    for and never overlaps the user's in-flight calendar jobs from the app.
+    """
+    users = iter(users.items())
+    workers = workers or os.cpu_count() or 1
+    if workers <= 1 or "fork" not in multiprocessing.get_all_start_methods():
+        for user, user_record in users:
+            try:
+                days, seconds = regenerate_user_calendar(user, user_record, total_days, start_date)
+                yield user, days, seconds, None
+            except Exception as e:
+                yield user, 0, 0.0, f"{type(e).__name__}: {e}"
+        return
+
+    load_wod_database()  # Convert the catalog once before forking, not in every worker
+    context = multiprocessing.get_context("fork")
+    tasks, results = context.Queue(), context.Queue()
+    processes = [
+        context.Process(target=_calendar_worker, args=(tasks, results, total_days, start_date), daemon=True)
+        for _ in range(workers)
+    ]
+    for process in processes:
+        process.start()
+    try:
+        pending = 0
+        for task in itertools.islice(users, 2 * workers):
+            tasks.put(task)
+            pending += 1
+        while pending:
+            yield results.get()
+            pending -= 1
+            task = next(users, None)
+            if task is not None:
+                tasks.put(task)
+                pending += 1
+    finally:
+        for _ in processes:
+            tasks.put(None)
+        for process in processes:
+            process.join(timeout=5)
+            if process.is_alive():
+                process.terminate()
+
+CALENDAR_JOB_FIRST_DAYS = 31  # Today and the next 30 days, written before the rest of the decade
+CALENDAR_JOB_CHUNK_DAYS = 365
+JOB_STATUSES_IN_FLIGHT = ("queued", "running")
+
+@functools.lru_cache(maxsize=None)
+def _jobs_store():
+    """Process-wide flag so the jobs schema check runs once per process."""
+    return {"lock": threading.Lock(), "ready": False}
+
+def connect_jobs():
+    """
+    Returns a connection to the job store: one row per job with its parameters, status and
+    progress. A partial unique index allows one in-flight job per (user, kind, params).
+    """
+    conn = open_sqlite(JOBS_DB_FILE)
+    store = _jobs_store()
+    if not store["ready"]:
+        with store["lock"]:
+            if not store["ready"]:
+                conn.execute(
+                    "CREATE TABLE IF NOT EXISTS jobs (id TEXT PRIMARY KEY, user TEXT NOT NULL, kind TEXT NOT NULL, "
+                    "params TEXT NOT NULL, status TEXT NOT NULL, done INTEGER NOT NULL DEFAULT 0, "
+                    "total INTEGER NOT NULL, ready_until TEXT, error TEXT, owner INTEGER, owner_started TEXT, "
+                    "created REAL NOT NULL, updated REAL NOT NULL)"
+                )
+                conn.execute(
+                    "CREATE UNIQUE INDEX IF NOT EXISTS idx_jobs_in_flight ON jobs (user, kind, params) "
+                    "WHERE status IN ('queued', 'running')"
+                )
+                conn.execute("CREATE INDEX IF NOT EXISTS idx_jobs_user ON jobs (user, kind, created)")
+                conn.commit()
+                store["ready"] = True
+    return conn
+
+_JOB_COLUMNS = [
+    "id", "user", "kind", "params", "status", "done", "total", "ready_until", "error", "owner", "owner_started", "created", "updated"
+]
+
+def _job_from_row(row):
+    job = dict(zip(_JOB_COLUMNS, row))
+    job["params"] = json.loads(job["params"])
+    return job
+
+def submit_job(user, kind, params, total, run=True):
+    """
+    Queues a job and returns its id. If an identical job (same user, kind and params) is
+    already queued or running, its id is returned instead of queueing a second one.
+    run=False leaves the job to the caller's run_job() instead of waking this process's runner.
+    """
+    params_json = json.dumps(params, sort_keys=True)
+    with closing(connect_jobs()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                "SELECT id FROM jobs WHERE user = ? AND kind = ? AND params = ? AND status IN ('queued', 'running')",
+                (user, kind, params_json)
+            ).fetchone()
+            if row is None:
+                job_id = uuid.uuid4().hex
+                now = time.time()
+                conn.execute(
+                    "INSERT INTO jobs (id, user, kind, params, status, total, created, updated) "
+                    "VALUES (?, ?, ?, ?, 'queued', ?, ?, ?)",
+                    (job_id, user, kind, params_json, total, now, now)
+                )
+                count_metric("jobs_submitted", kind=kind)
+            else:
+                job_id = row[0]
+                count_metric("jobs_deduplicated", kind=kind)
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    if run:
+        _job_runner().wake()
+    return job_id
+
+def _seen_job(row):
+    """Decodes a job row; seeing one in flight makes sure this process runs (and recovers) jobs."""
+    if row is None:
+        return None
+    job = _job_from_row(row)
+    if job["status"] in JOB_STATUSES_IN_FLIGHT:
+        _job_runner().start()
+    return job
+
+def load_job(job_id):
+    """Returns the job as a dict (params decoded), or None if unknown."""
+    with closing(connect_jobs()) as conn:
+        row = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+    return _seen_job(row)
+
+def latest_job(user, kind=None):
+    """Returns the user's most recently submitted job (of kind, if given), or None."""
+    with closing(connect_jobs()) as conn:
+        if kind is None:
+            row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE user = ? ORDER BY created DESC LIMIT 1", (user,)
+            ).fetchone()
+        else:
+            row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE user = ? AND kind = ? ORDER BY created DESC LIMIT 1",
+                (user, kind)
+            ).fetchone()
+    return _seen_job(row)
+
+def wait_for_job(job_id, ready_until=None, timeout=10.0, interval=0.05):
+    """
+    Polls until the job has finished or, with ready_until, has written every day up to that
+    date; returns the last state seen (possibly still in flight after timeout seconds).
+    """
+    deadline = time.monotonic() + timeout
+    while True:
+        job = load_job(job_id)
+        if job is None or job["status"] not in JOB_STATUSES_IN_FLIGHT:
+            return job
+        if ready_until is not None and job["ready_until"] is not None and job["ready_until"] >= str(ready_until):
+            return job
+        if time.monotonic() >= deadline:
+            return job
+        time.sleep(interval)
+
+def _update_job(job_id, **fields):
+    fields["updated"] = time.time()
+    with closing(connect_jobs()) as conn, conn:
+        conn.execute(
+            f"UPDATE jobs SET {', '.join(f'{name} = ?' for name in fields)} WHERE id = ?",
+            (*fields.values(), job_id)
+        )
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+def _process_start(pid):
+    """
+    Identifies the process running as pid by the kernel boot id and its start time, so a PID
+    reused by a later process does not match; None where /proc is not available.
+    """
+    try:
+        with open(f"/proc/{pid}/stat") as f:
+            stat = f.read()
+        with open("/proc/sys/kernel/random/boot_id") as f:
+            boot_id = f.read().strip()
+    except OSError:
+        return None
+    # starttime is field 22; the command name before it (field 2) may contain spaces
+    return f"{boot_id}:{stat.rsplit(')', 1)[1].split()[19]}"
+
+@functools.lru_cache(maxsize=None)
+def _process_token(pid):
+    """This process's owner_started; keyed by PID so a forked child works out its own."""
+    # Without /proc a random token still tells this process apart from an earlier one with its PID
+    return _process_start(pid) or uuid.uuid4().hex
+
+def _job_owner_alive(owner, owner_started):
+    """
+    True if the process that claimed a job still runs: its PID is alive and, where start times
+    can be read, was started when the job was claimed. Other processes' PIDs are only checked
+    for liveness without /proc.
+    """
+    if owner is None:
+        return False
+    if owner == os.getpid():
+        return owner_started == _process_token(owner)
+    if not _pid_alive(owner):
+        return False
+    started = _process_start(owner)
+    return started is None or started == owner_started
+
+class JobRunner:
+    """
+    Runs queued jobs one at a time on a daemon thread of this process, so they outlive the
+    request (or browser tab) that submitted them. Progress is persisted after every step.
+    Before looking for work the runner queues again any job left running by a process that
+    is gone, so it resumes from its progress. The thread starts on the first submit or on
+    the first sighting of an in-flight job (see _seen_job()), and picks up jobs queued by
+    other processes within poll_interval seconds.
+    """
+
+    def __init__(self, poll_interval=5.0):
+        self.poll_interval = poll_interval
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stopping = False
+        self._thread = None
+
+    def start(self):
+        """Starts the worker thread unless it is already running."""
+        with self._lock:
+            if not self._stopping and (self._thread is None or not self._thread.is_alive()):
+                self._thread = threading.Thread(target=self._run, name="wody-jobs", daemon=True)
+                self._thread.start()
+
+    def wake(self):
+        self.start()
+        self._wake.set()
+
+    def stop(self, timeout=10.0):
+        """Lets the current job finish, then ends the worker thread."""
+        with self._lock:
+            self._stopping = True
+            thread = self._thread
+        self._wake.set()
+        if thread is not None:
+            thread.join(timeout)
+
+    def _run(self):
+        while not self._stopping:
+            self._wake.clear()
+            _recover_jobs()
+            job = _claim_job()
+            if job is None:
+                self._wake.wait(self.poll_interval)
+                continue
+            _execute_job(job)
+
+def _recover_jobs():
+    """Queues again every running job whose owning process no longer exists."""
+    with closing(connect_jobs()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            for job_id, owner, owner_started in conn.execute(
+                "SELECT id, owner, owner_started FROM jobs WHERE status = 'running'"
+            ).fetchall():
+                if not _job_owner_alive(owner, owner_started):
+                    logger.info("Resuming job %s left running by process %s", job_id, owner)
+                    conn.execute(
+                        "UPDATE jobs SET status = 'queued', owner = NULL, owner_started = NULL WHERE id = ?", (job_id,)
+                    )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+def _claim_job(user=None):
+    """
+    Marks the oldest queued job (of user, if given) as running in this process and returns it,
+    or None. A user's jobs run one after another, in submission order, even across processes.
+    """
+    with closing(connect_jobs()) as conn:
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute(
+                f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs AS job WHERE status = 'queued' AND NOT EXISTS ("
+                "SELECT 1 FROM jobs AS earlier WHERE earlier.user = job.user AND earlier.status IN ('queued', 'running') "
+                "AND (earlier.status = 'running' OR earlier.created < job.created)"
+                ") AND (? IS NULL OR user = ?) ORDER BY created LIMIT 1",
+                (user, user)
+            ).fetchone()
+            if row is not None:
+                conn.execute(
+                    "UPDATE jobs SET status = 'running', owner = ?, owner_started = ?, updated = ? WHERE id = ?",
+                    (os.getpid(), _process_token(os.getpid()), time.time(), row[0])
+                )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+    return _job_from_row(row) if row else None
+
+def _execute_job(job):
+    """Runs a claimed job to completion and records whether it finished or failed."""
+    with span("job", kind=job["kind"]):
+        try:
+            _JOB_KINDS[job["kind"]](job)
+            _update_job(job["id"], status="done")
+        except Exception as e:
+            logger.exception("Job %s (%s) failed", job["id"], job["kind"])
+            _update_job(job["id"], status="failed", error=f"{type(e).__name__}: {e}")
+
+def run_job(job_id, interval=0.05):
+    """
+    Runs job_id in the calling thread, for tools that schedule their own work (see
+    regenerate_calendars()). The user's earlier queued jobs are run first, in order; jobs a
+    runner already claimed are waited for. Returns the finished job, or None if unknown.
+    """
+    while True:
+        with closing(connect_jobs()) as conn:
+            row = conn.execute(f"SELECT {', '.join(_JOB_COLUMNS)} FROM jobs WHERE id = ?", (job_id,)).fetchone()
+        if row is None:
+            return None
+        job = _job_from_row(row)
+        if job["status"] not in JOB_STATUSES_IN_FLIGHT:
+            return job
+        _recover_jobs()
+        claimed = _claim_job(job["user"])
+        if claimed is not None:
+            _execute_job(claimed)
+        else:
+            time.sleep(interval)
+
+@functools.lru_cache(maxsize=None)
+def _job_runner():
+    return JobRunner()
+
+def submit_calendar_job(user, user_preferences, total_days=3650):
+    """
+    Queues a flush-and-regenerate of the user's stored calendar from today with user_preferences
+    and their saved sliders, and returns the job id. Today and the next 30 days are written
+    first, then the rest in yearly chunks; earlier stored days keep showing until replaced.
+    Raises ValueError if the WOD database is empty or no WOD matches user_preferences.
+    In "generated" mode there is nothing to build: future overrides are dropped and None is returned.
+    """
+    if get_calendar_mode() == "generated":
+        initialize_wod_calendar(user, user_preferences, flush=True)
+        return None
+    if not load_wod_database():
+        raise ValueError("WOD Database is empty. Please regenerate the WOD Database first.")
+    if len(load_movement_index().matching_ids(user_preferences)) == 0:
+        raise ValueError("No WODs match your preferred movements. Please adjust your preferences.")
+    user_record = load_user_record(user) or {}
+    params = {
+        "start": str(datetime.date.today()),
+        "preferred_movements": list(user_preferences),
+        "skill_level": user_record.get("skill_level", 3),
+        "intensity": user_record.get("intensity", 3),
+        "variety": user_record.get("variety", 3),
+    }
+    return submit_job(user, "calendar", params, total_days)
+
+def _job_movement_load(user, start_date, done):
+    """The user's MovementLoad for a calendar job resuming after done days, replaying the days already written."""
+    movement_load = load_movement_load(user).copy()
+    if done:
+        resume = start_date + datetime.timedelta(days=done)
+        stored = load_wod_calendar_range(
+            str(resume - datetime.timedelta(days=movement_load.window_days)), str(resume - datetime.timedelta(days=1)), user
+        )
+        for date_str in sorted(stored):
+            movement_load.record(date_str, wod_spec(stored[date_str]).movements())
+    return movement_load
+
+def _job_chunks(start_date, done, total):
+    """Yields (first date, days) windows still to process: the first month, then a year at a time."""
+    while done < total:
+        days = min(CALENDAR_JOB_FIRST_DAYS if done == 0 else CALENDAR_JOB_CHUNK_DAYS, total - done)
+        yield start_date + datetime.timedelta(days=done), days
+        done += days
+
+def _write_user_calendar_days(user, days, trim_after=None):
+    """Upserts {date_str: wod} into the user's calendar, optionally dropping every day after trim_after. Raises on failure."""
+    with closing(connect_wod_calendar()) as conn, conn:
+        conn.executemany(
+            "INSERT INTO user_wod_calendar (user, date, wod) VALUES (?, ?, ?) "
+            "ON CONFLICT(user, date) DO UPDATE SET wod = excluded.wod",
+            [(user, date_str, json.dumps(wod)) for date_str, wod in days.items()]
+        )
+        if trim_after is not None:
+            conn.execute("DELETE FROM user_wod_calendar WHERE user = ? AND date > ?", (user, trim_after))
+        _bump_calendar_version(conn)
+
+def _job_inputs():
+    """(WOD database, themes) for a job; raises if the database is empty."""
+    database = load_wod_database()
+    if not database:
+        raise RuntimeError("WOD Database is empty")
+    return database, load_global_config().get("themes", ["Full Body"])
+
+def _run_calendar_job(job):
+    user, params = job["user"], job["params"]
+    start_date = datetime.date.fromisoformat(params["start"])
+    user_record = {name: params[name] for name in ("preferred_movements", "skill_level", "intensity", "variety")}
+    database, themes = _job_inputs()
+    movement_load = _job_movement_load(user, start_date, job["done"])
+    done, total = job["done"], job["total"]
+    for chunk_start, days in _job_chunks(start_date, done, total):
+        calendar = generate_wod_calendar_batch(chunk_start, days, user_record, database, themes, movement_load=movement_load)
+        last = max(calendar)
+        # Days beyond the new horizon belonged to the previous plan
+        _write_user_calendar_days(user, calendar, trim_after=last if done + days >= total else None)
+        done += days
+        _update_job(job["id"], done=done, ready_until=last)
+
+_GENERATED_FORMATS = ("For Time", "Rounds For Time", "AMRAP")
+_STRENGTH_SETS_PATTERN = re.compile(r"^(\d+) sets of ")
+
+def calendar_wod_format(skill):
+    """The WOD format generated for a skill level (see suggest_ai_wod())."""
+    if skill >= 4:
+        return "For Time"
+    if skill >= 2:
+        return "Rounds For Time"
+    return "AMRAP"
+
+def _intensity_ranges(intensity):
+    """Inclusive (low, high) strength sets, rounds per format and AMRAP minutes generated at intensity."""
+    half = intensity // 2
+    return {
+        "sets": (3 + half, 5 + half),
+        "For Time": (3 + half, 5 + half),
+        "Rounds For Time": (4 + half, 6 + half),
+        "AMRAP": (12 + intensity, 20 + intensity),
+    }
+
+def preference_changes(old_record, new_record):
+    """
+    What an edit of preferences and sliders can invalidate on the calendar, or None if nothing:
+    "removed" movements, the new "format" if the skill level moved to another format, the new
+    "intensity" if it changed, and "movements" (whether the new preferences have any).
+    Added movements and variety do not invalidate existing days; new days pick them up.
+    """
+    old_movements = set(old_record.get("preferred_movements", []))
+    new_movements = list(new_record.get("preferred_movements", []))
+    old_format = calendar_wod_format(old_record.get("skill_level", 3))
+    new_format = calendar_wod_format(new_record.get("skill_level", 3))
+    old_intensity = old_record.get("intensity", 3)
+    new_intensity = new_record.get("intensity", 3)
+    changes = {
+        "removed": old_movements.difference(new_movements),
+        "format": new_format if new_format != old_format else None,
+        "intensity": new_intensity if new_intensity != old_intensity else None,
+        "movements": bool(new_movements),
+    }
+    if not changes["removed"] and changes["format"] is None and changes["intensity"] is None:
+        if old_movements or not new_movements:
+            return None
+    return changes
+
+def calendar_day_needs_update(wod, changes):
+    """
+    True if a stored day no longer fits changes (see preference_changes()): its WOD uses a
+    removed movement, has the old format, or has strength sets, rounds or AMRAP minutes the new
+    intensity would not generate. Standard WODs are only checked for movements and strength,
+    and "No WOD available" days are replaced once there are movements to use.
+    """
+    spec = wod_spec(wod)
+    if changes["removed"] and not changes["removed"].isdisjoint(spec.movements()):
+        return True
+    day_format = wod.get("Format") or spec.format
+    if day_format == "N/A":
+        return changes["movements"]
+    if day_format not in _GENERATED_FORMATS:
+        return False
+    if changes["format"] is not None and day_format != changes["format"]:
+        return True
+    if changes["intensity"] is not None:
+        ranges = _intensity_ranges(changes["intensity"])
+        match = _STRENGTH_SETS_PATTERN.match(wod.get("Strength", ""))
+        if match:
+            low, high = ranges["sets"]
+            if not low <= int(match.group(1)) <= high:
+                return True
+        if spec.format == day_format:
+            count = spec.duration if day_format == "AMRAP" else spec.rounds
+            low, high = ranges[day_format]
+            if count is not None and not low <= count <= high:
+                return True
+    return False
+
+def submit_calendar_update(user, old_record, new_record):
+    """
+    Queues an incremental update of the user's stored calendar after their preferences or
+    sliders changed from old_record to new_record, and returns the job id. Only days from today
+    on that calendar_day_needs_update() are regenerated; past and still valid days are kept.
+    Returns None when the change cannot invalidate any day, or in "generated" mode (every
+    WOD is derived from the current preferences on demand).
+    """
+    if get_calendar_mode() == "generated":
+        return None
+    changes = preference_changes(old_record, new_record)
+    if changes is None:
+        return None
+    today = datetime.date.today()
+    last = _calendar_horizon(user)
+    if last < str(today):
+        return None
+    fields = ("preferred_movements", "skill_level", "intensity", "variety")
+    params = {
+        "start": str(today),
+        "old": {name: old_record.get(name) for name in fields},
+        "new": {name: new_record.get(name) for name in fields},
+    }
+    # An estimate: the job re-derives its horizon when it runs
+    total = (datetime.date.fromisoformat(last) - today).days + 1
+    return submit_job(user, "calendar_update", params, total)
+
+def _calendar_horizon(user):
+    """
+    The last date the user's stored calendar covers or will cover: the latest stored day, or
+    the end of a calendar job of theirs that is still queued or running, whichever is later.
+    Returns "" when there is neither.
+    """
+    with closing(connect_wod_calendar()) as conn:
+        last = max(
+            conn.execute("SELECT max(date) FROM wod_calendar").fetchone()[0] or "",
+            conn.execute("SELECT max(date) FROM user_wod_calendar WHERE user = ?", (user,)).fetchone()[0] or "",
+        )
+    with closing(connect_jobs()) as conn:
+        rows = conn.execute(
+            "SELECT params, total FROM jobs WHERE user = ? AND kind = 'calendar' AND status IN ('queued', 'running')", (user,)
+        ).fetchall()
+    for params, total in rows:
+        start = datetime.date.fromisoformat(json.loads(params)["start"])
+        last = max(last, str(start + datetime.timedelta(days=total - 1)))
+    return last
+
+def _run_calendar_update_job(job):
+    user, params = job["user"], job["params"]
+    start_date = datetime.date.fromisoformat(params["start"])
+    changes = preference_changes(params["old"], params["new"])
+    database, themes = _job_inputs()
+    movement_load = _job_movement_load(user, start_date, job["done"])
+    done = job["done"]
+    # The user's earlier jobs have finished by now (see _claim_job()), so the calendar's
+    # final horizon is known; the total estimated at submit time may have been short
+    horizon = _calendar_horizon(user)
+    total = max(job["total"], (datetime.date.fromisoformat(horizon) - start_date).days + 1 if horizon else 0)
+    if total != job["total"]:
+        _update_job(job["id"], total=total)
+    for chunk_start, days in _job_chunks(start_date, done, total):
+        last = str(chunk_start + datetime.timedelta(days=days - 1))
+        stored = load_wod_calendar_range(str(chunk_start), last, user)
+        affected = [date_str for date_str in sorted(stored) if calendar_day_needs_update(stored[date_str], changes)]
+        if affected:
+            regenerated = set(affected)
+            kept = {date_str: wod for date_str, wod in stored.items() if date_str not in regenerated}
+            calendar = generate_wod_calendar_batch(
+                chunk_start, len(affected), params["new"], database, themes,
+                movement_load=movement_load, dates=affected, kept_days=kept, excluded_movements=changes["removed"]
+            )
+            _write_user_calendar_days(user, calendar)
+        else:
+            for date_str in sorted(stored):
+                movement_load.record(date_str, wod_spec(stored[date_str]).movements())
+        count_metric("calendar_days_regenerated", len(affected))
+        done += days
+        _update_job(job["id"], done=done, ready_until=last)
+
+_JOB_KINDS = {"calendar": _run_calendar_job, "calendar_update": _run_calendar_update_job}
+
+CHART_MAX_POINTS = 400
+
+def lttb(x, y, threshold):
+    """
+    Largest-Triangle-Three-Buckets downsampling of a series sorted by x.
+    Keeps the first and last points and, per bucket, the point forming the largest triangle
+    with the previously kept point and the next bucket's mean. Returns the kept indices.
+    """
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    kept = np.empty(threshold, dtype=np.int64)
+    kept[0], kept[-1] = 0, n - 1
+    previous = 0
+    for bucket in range(threshold - 2):
+        start, stop = edges[bucket], edges[bucket + 1]
+        next_stop = edges[bucket + 2] if bucket + 2 < len(edges) else n
+        next_x = x[stop:next_stop].mean()
+        next_y = y[stop:next_stop].mean()
+        area = np.abs(
+            (x[previous] - next_x) * (y[start:stop] - y[previous])
+            - (x[previous] - x[start:stop]) * (next_y - y[previous])
+        )
+        previous = start + int(np.argmax(area))
+        kept[bucket + 1] = previous
+    return kept
+
+def performance_chart_data(user, metric, max_points=CHART_MAX_POINTS):
+    """
+    Returns (DataFrame with Date and value columns, total points) for one metric, sorted by date
+    and downsampled with LTTB to at most max_points rows.
+    """
+    import pandas as pd
+    df = load_workout_results(user)
+    if metric == "Result":
+        values = df["Result"].map(parse_result_str)
+    else:
+        values = df[metric]
+    data = pd.DataFrame({"Date": pd.to_datetime(df["Date"], errors="coerce"), metric: pd.to_numeric(values, errors="coerce")})
+    data = data.dropna().sort_values("Date", kind="stable").reset_index(drop=True)
+    total = len(data)
+    if total > max_points:
+        x = data["Date"].to_numpy().astype("datetime64[s]").astype(np.float64)
+        data = data.iloc[lttb(x, data[metric].to_numpy(dtype=np.float64), max_points)]
+    return data, total